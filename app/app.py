@@ -1,27 +1,75 @@
-from flask import Flask
+import os
+import time
+from flask import Flask, g, request
 from settings import config
 from flask_cors import CORS
 
 
 #Routes
-from routes import OcrRoutes,ImageRoutes, ValidateRoutes
-
-app = Flask(__name__)
-
-CORS(app, resources={r"/api/*": {"origins": "http://localhost:3000"}})
+from routes import OcrRoutes,ImageRoutes, ValidateRoutes, HealthRoutes, VerifyRoutes, BatchRoutes, MetricsRoutes, AdminRoutes
+from services import lifecycle
+from utils import request_context
+from utils.logger import logger
 
 def page_not_found(error):
     return 'Esta pÃ¡gina no existe', 404
 
-if __name__ == '__main__':
+def start_request():
+    # Identificar cada petición (la del cliente si envía X-Request-ID) para logs y perfiles
+    request_context.start_request(request.headers.get(request_context.REQUEST_ID_HEADER))
+    g.request_start = time.perf_counter()
+
+def add_request_id(response):
+    request_id = request_context.get_request_id()
+    if request_id:
+        response.headers[request_context.REQUEST_ID_HEADER] = request_id
+    if 'request_start' in g:
+        logger.info("Request", extra={
+            "method": request.method, "path": request.path, "status": response.status_code,
+            "seconds": round(time.perf_counter() - g.request_start, 4)
+        })
+    return response
+
+def create_app(config_name=None, preload=False):
+    """
+    Build the Flask application.
+
+    With preload=True the reference data and model weights are loaded synchronously in the calling
+    process (the gunicorn master before forking) and each worker finishes its warmup with
+    lifecycle.start(); otherwise everything is loaded in a background thread of this process.
+    """
+    app = Flask(__name__)
+
     #Config
-    app.config.from_object(config['development'])
+    app.config.from_object(config[config_name or os.getenv('APP_ENV', 'development')])
+
+    CORS(app, resources={r"/api/*": {"origins": "http://localhost:3000"}})
 
     #Blueprints
     app.register_blueprint(OcrRoutes.main, url_prefix='/api/ocr')
     app.register_blueprint(ImageRoutes.main, url_prefix='/api/static')
     app.register_blueprint(ValidateRoutes.main, url_prefix='/api/validate')
+    app.register_blueprint(VerifyRoutes.main, url_prefix='/api/verify')
+    app.register_blueprint(BatchRoutes.main, url_prefix='/api/batch')
+    app.register_blueprint(HealthRoutes.main)
+    app.register_blueprint(MetricsRoutes.main)
+    app.register_blueprint(AdminRoutes.main, url_prefix='/api/admin')
+
+    #Request ID
+    app.before_request(start_request)
+    app.after_request(add_request_id)
 
     #Error handlers
     app.register_error_handler(404, page_not_found)
-    app.run(host='0.0.0.0', port=5000)
\ No newline at end of file
+
+    #Cargar referencias, motores OCR y modelo facial; /readyz indica cuándo terminó
+    if preload:
+        lifecycle.preload()
+    else:
+        lifecycle.start()
+
+    return app
+
+if __name__ == '__main__':
+    app = create_app()
+    app.run(host='0.0.0.0', port=5000)
@@ -0,0 +1,293 @@
+"""
+Asyncio front end (ASGI) with the same API as the Flask app:
+
+    uvicorn asgi:app --app-dir app --host 0.0.0.0 --port 5000
+
+Handlers only parse the request and await the pipelines, which run in a bounded thread pool
+behind an admission queue: when it is full requests get a 429 right away, and when they wait too
+long for a slot (or the OCR executor is saturated) a 503, both with Retry-After.
+"""
+import asyncio
+import contextvars
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import AsyncExitStack, asynccontextmanager
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.concurrency import iterate_in_threadpool
+from starlette.responses import FileResponse, JSONResponse, PlainTextResponse, Response, StreamingResponse
+from starlette.routing import Route
+from settings import Config
+from routes.BatchRoutes import ndjson
+from services import lifecycle, pipeline
+from services.back_normalize import InvalidMode, check_mode
+from services.ocr_executor import ExecutorSaturated
+from services.quality import ImageQualityRejected
+from utils import batch_input, image_utils, metrics, profiling, request_context, storage
+from utils.admission import AdmissionController, AdmissionRejected, AdmissionTimeout
+from utils.logger import logger
+
+STATIC_FOLDER = os.path.abspath(os.path.join(os.path.dirname(__file__), '../static'))
+
+executor = ThreadPoolExecutor(Config.ASGI_WORKERS, thread_name_prefix='asgi')
+admission = AdmissionController(Config.ASGI_WORKERS, Config.ASGI_MAX_QUEUE, Config.ASGI_QUEUE_TIMEOUT)
+metrics.track_queue('admission', admission.stats)
+
+# Tamaño de cada escritura al copiar el cuerpo de /api/batch a su temporal
+SPOOL_WRITE_BYTES = 1024 * 1024
+
+
+def mode_response(error):
+    return JSONResponse({"error": str(error), "allowed": error.allowed}, status_code=400)
+
+
+def busy_response(status, error):
+    return JSONResponse(
+        {"error": "Service busy", "message": str(error)},
+        status_code=status,
+        headers={"Retry-After": str(Config.ASGI_RETRY_AFTER_SECONDS)}
+    )
+
+
+async def handle(request, parse, fn):
+    """
+    Run a request: reserve an admission place, read the body with parse(request) (which returns
+    the arguments of fn, or a response for invalid input), then wait for an execution slot and
+    run fn in the bounded executor. Same status codes as the Flask routes, plus 429/503.
+    """
+    request_id = request_context.start_request(request.headers.get(request_context.REQUEST_ID_HEADER))
+    route = request.scope['endpoint'].__name__
+    start = time.perf_counter()
+    try:
+        # Reservar antes de leer el cuerpo: con la cola llena el 429 sale sin recibir la subida
+        async with admission.reserve():
+            parsed = await parse(request)
+            if isinstance(parsed, Response):
+                response = parsed
+            else:
+                async with admission.slot():
+                    # El hilo del executor hereda el contexto de la petición (request ID)
+                    context = contextvars.copy_context()
+                    response = JSONResponse(await asyncio.get_running_loop().run_in_executor(
+                        executor, context.run, profiling.profiled, route,
+                        request.headers.get(Config.PROFILE_HEADER), fn, *parsed))
+    except AdmissionRejected as e:
+        response = busy_response(429, e)
+    except (AdmissionTimeout, ExecutorSaturated) as e:
+        response = busy_response(503, e)
+    except InvalidMode as e:
+        response = mode_response(e)
+    except ImageQualityRejected as e:
+        response = JSONResponse({"error": "Image quality too low", "quality": e.report}, status_code=422)
+    except pipeline.AlignmentFailed as e:
+        response = JSONResponse({"error": str(e)}, status_code=400)
+    except pipeline.IncompleteArtifacts as e:
+        response = JSONResponse({"error": str(e)}, status_code=400)
+    except pipeline.ArtifactNotFound as e:
+        response = JSONResponse({"error": str(e), "missing": e.missing}, status_code=410)
+    except Exception as e:
+        response = JSONResponse({"error": "An error occurred", "message": str(e)}, status_code=500)
+    response.headers[request_context.REQUEST_ID_HEADER] = request_id
+    logger.info("Request", extra={
+        "method": request.method, "path": request.url.path, "status": response.status_code,
+        "seconds": round(time.perf_counter() - start, 4)
+    })
+    return response
+
+
+def _decode_and_run(run, data, mode):
+    return run(image_utils.decode_image(data), mode)
+
+
+async def _ocr(request, run):
+    async def parse(request):
+        form = await request.form()
+        upload = form.get('image')
+        if upload is None or isinstance(upload, str):
+            return JSONResponse({"error": "No image uploaded"}, status_code=400)
+        return run, await upload.read(), request.query_params.get('mode')
+
+    return await handle(request, parse, _decode_and_run)
+
+
+async def front_ocr_route(request):
+    return await _ocr(request, pipeline.run_front)
+
+
+async def back_ocr_route(request):
+    return await _ocr(request, pipeline.run_back)
+
+
+def _decode_and_verify(front_data, back_data, mode):
+    return pipeline.run_verify(image_utils.decode_image(front_data), image_utils.decode_image(back_data), mode)
+
+
+async def _parse_verify(request):
+    form = await request.form()
+    front, back = form.get('front'), form.get('back')
+    if front is None or back is None or isinstance(front, str) or isinstance(back, str):
+        return JSONResponse({"error": "Both 'front' and 'back' images are required"}, status_code=400)
+    return await front.read(), await back.read(), request.query_params.get('mode')
+
+
+async def verify_route(request):
+    return await handle(request, _parse_verify, _decode_and_verify)
+
+
+def _form_items(form, default_side):
+    for field, value in form.multi_items():
+        if isinstance(value, str):
+            continue
+        if field in batch_input.SIDES:
+            yield value.filename, field, value.file.read()
+        elif field == 'images':
+            yield value.filename, batch_input.side_from_name(value.filename, default_side), value.file.read()
+        elif field == 'archive':
+            yield from batch_input.iter_archive(value.file, default_side)
+
+
+class AdmittedStreamingResponse(StreamingResponse):
+    """
+    Streaming response that holds an admission slot until the body is sent or the client leaves.
+    """
+
+    def __init__(self, content, slot, **kwargs):
+        super().__init__(content, **kwargs)
+        self.slot = slot
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await self.slot.aclose()
+
+
+async def _spool_body(request):
+    # Copiar el cuerpo a un temporal con las escrituras fuera del event loop (pasa a disco al crecer)
+    spooled = batch_input.spool([])
+    buffer = bytearray()
+    async for chunk in request.stream():
+        buffer += chunk
+        if len(buffer) >= SPOOL_WRITE_BYTES:
+            await asyncio.to_thread(spooled.write, bytes(buffer))
+            buffer.clear()
+    await asyncio.to_thread(spooled.write, bytes(buffer))
+    spooled.seek(0)
+    return spooled
+
+
+async def batch_route(request):
+    # El lote ocupa un hueco de admisión mientras dura; sus imágenes van al pool de BATCH_WORKERS
+    default_side = request.query_params.get('side')
+    try:
+        mode = check_mode(request.query_params.get('mode'))
+    except InvalidMode as e:
+        return mode_response(e)
+
+    request_id = request_context.start_request(request.headers.get(request_context.REQUEST_ID_HEADER))
+    slot = AsyncExitStack()
+    try:
+        # Reservar antes de recibir el cuerpo; el hueco de ejecución se espera ya con el lote leído
+        await slot.enter_async_context(admission.reserve())
+        if request.headers.get('content-type', '').startswith('multipart/form-data'):
+            items = _form_items(await request.form(), default_side)
+        else:
+            # El cuerpo se copia entero antes de procesar (zip necesita acceso aleatorio)
+            items = batch_input.iter_archive(await _spool_body(request), default_side)
+        await slot.enter_async_context(admission.slot())
+    except AdmissionRejected as e:
+        return busy_response(429, e)
+    except AdmissionTimeout as e:
+        await slot.aclose()
+        return busy_response(503, e)
+    except BaseException:
+        await slot.aclose()
+        raise
+
+    results = pipeline.run_batch(items, mode)
+    return AdmittedStreamingResponse(iterate_in_threadpool(ndjson(results)), slot,
+                                     media_type='application/x-ndjson',
+                                     headers={request_context.REQUEST_ID_HEADER: request_id})
+
+
+async def _parse_validate(request):
+    try:
+        return (await request.json(),)
+    except ValueError as e:
+        return JSONResponse({"error": "An error occurred", "message": str(e)}, status_code=500)
+
+
+async def validate_route(request):
+    return await handle(request, _parse_validate, pipeline.run_validate)
+
+
+async def storage_stats(request):
+    return JSONResponse(storage.usage_stats())
+
+
+async def get_image(request):
+    path = os.path.abspath(os.path.join(STATIC_FOLDER, request.path_params['filename']))
+    if not path.startswith(STATIC_FOLDER + os.sep) or not os.path.isfile(path):
+        return PlainTextResponse('Not Found', status_code=404)
+    return FileResponse(path)
+
+
+async def healthz(request):
+    return JSONResponse({"status": "ok"})
+
+
+async def readyz(request):
+    status = lifecycle.status()
+    if not status["ready"]:
+        lifecycle.retry()
+    status["admission"] = admission.stats()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+
+async def list_profiles(request):
+    if not profiling.authorized(request.headers.get(Config.PROFILE_HEADER)):
+        return PlainTextResponse('Not Found', status_code=404)
+    return JSONResponse(profiling.list_profiles())
+
+
+async def get_profile(request):
+    name = request.path_params['name']
+    path = profiling.profile_path(name)
+    if not profiling.authorized(request.headers.get(Config.PROFILE_HEADER)) or path is None:
+        return PlainTextResponse('Not Found', status_code=404)
+    return FileResponse(path, filename=name if name.endswith('.prof') else None)
+
+
+async def metrics_route(request):
+    body, content_type = metrics.render()
+    return Response(body, media_type=content_type)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # Cargar referencias, motores OCR y modelo en segundo plano; /readyz indica cuándo terminó
+    lifecycle.start()
+    yield
+    executor.shutdown(wait=False)
+
+
+app = Starlette(
+    routes=[
+        Route('/api/ocr/front', front_ocr_route, methods=['POST']),
+        Route('/api/ocr/back', back_ocr_route, methods=['POST']),
+        Route('/api/validate/', validate_route, methods=['POST']),
+        Route('/api/verify/', verify_route, methods=['POST']),
+        Route('/api/batch/', batch_route, methods=['POST']),
+        Route('/api/static/_stats', storage_stats),
+        Route('/api/static/{filename:path}', get_image),
+        Route('/healthz', healthz),
+        Route('/readyz', readyz),
+        Route('/metrics', metrics_route),
+        Route('/api/admin/profiles', list_profiles),
+        Route('/api/admin/profiles/{name}', get_profile)
+    ],
+    middleware=[Middleware(CORSMiddleware, allow_origins=["http://localhost:3000"], allow_methods=["*"], allow_headers=["*"])],
+    lifespan=lifespan
+)
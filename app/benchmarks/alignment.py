@@ -0,0 +1,103 @@
+import json
+import os
+import time
+import cv2
+import numpy as np
+from services import back_normalize
+from utils import path_utils
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+
+def _corner_error(M_reference, M_candidate, shape):
+    """
+    Mean distance (in reference pixels) between the card corners projected by both homographies.
+    """
+    height, width = shape
+    corners = np.float32([[0, 0], [width, 0], [width, height], [0, height]]).reshape(-1, 1, 2)
+    # Llevar las esquinas de la referencia a la imagen con el camino completo y volver con el candidato
+    in_image = cv2.perspectiveTransform(corners, np.linalg.inv(M_reference))
+    round_trip = cv2.perspectiveTransform(in_image, M_candidate)
+    return float(np.mean(np.linalg.norm(round_trip - corners, axis=2)))
+
+
+def _timed(fn, repeat):
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best * 1000
+
+
+def run(image_dir, side='front', max_sides=(800, 1200, 1600), refine_min_inliers=40, repeat=3, backend='sift'):
+    """
+    Compare the full-resolution alignment against the pyramid mode on the same images.
+    Accuracy is reported as the corner disagreement with the full-resolution homography.
+    """
+    reference_features = path_utils.get_front_reference_features(backend) if side == 'front' \
+        else path_utils.get_back_reference_features(backend)
+
+    images = []
+    for filename in sorted(os.listdir(image_dir)):
+        if filename.lower().endswith(IMAGE_EXTENSIONS):
+            image = cv2.imread(os.path.join(image_dir, filename))
+            if image is not None:
+                images.append((filename, image))
+
+    rows = []
+    for filename, image in images:
+        (M_full, shape, inliers_full), ms_full = _timed(
+            lambda: back_normalize.estimate_alignment(image, reference_features), repeat)
+        row = {
+            "image": filename,
+            "resolution": [image.shape[1], image.shape[0]],
+            "full": {"ms": round(ms_full, 1), "inliers": inliers_full, "aligned": M_full is not None}
+        }
+
+        for max_side in max_sides:
+            (M_pyr, shape_pyr, inliers_pyr), ms_pyr = _timed(
+                lambda: back_normalize.estimate_alignment_pyramid(
+                    image, reference_features, max_side, refine_min_inliers), repeat)
+            entry = {"ms": round(ms_pyr, 1), "inliers": inliers_pyr, "aligned": M_pyr is not None}
+            if M_full is not None and M_pyr is not None and shape == shape_pyr:
+                entry["corner_error_px"] = round(_corner_error(M_full, M_pyr, shape), 2)
+            row[f"pyramid_{max_side}"] = entry
+
+        rows.append(row)
+
+    return {"side": side, "backend": backend, "images": len(rows), "summary": _summarize(rows, max_sides), "rows": rows}
+
+
+def _summarize(rows, max_sides):
+    summary = {}
+    for mode in ['full'] + [f"pyramid_{side}" for side in max_sides]:
+        entries = [row[mode] for row in rows]
+        if not entries:
+            continue
+        errors = [entry["corner_error_px"] for entry in entries if "corner_error_px" in entry]
+        summary[mode] = {
+            "median_ms": round(float(np.median([entry["ms"] for entry in entries])), 1),
+            "aligned": sum(1 for entry in entries if entry["aligned"]),
+            "median_inliers": int(np.median([entry["inliers"] for entry in entries])),
+            "mean_corner_error_px": round(float(np.mean(errors)), 2) if errors else None,
+            "max_corner_error_px": round(float(np.max(errors)), 2) if errors else None
+        }
+    return summary
+
+
+def print_report(report):
+    print(f"Alineación {report['side']} ({report['backend']}): {report['images']} imágenes")
+    print(f"{'modo':<16}{'mediana ms':>12}{'alineadas':>11}{'inliers':>9}{'err medio px':>14}{'err máx px':>12}")
+    for mode, stats in report["summary"].items():
+        mean_error = '-' if stats["mean_corner_error_px"] is None else stats["mean_corner_error_px"]
+        max_error = '-' if stats["max_corner_error_px"] is None else stats["max_corner_error_px"]
+        print(f"{mode:<16}{stats['median_ms']:>12}{stats['aligned']:>11}{stats['median_inliers']:>9}"
+              f"{mean_error:>14}{max_error:>12}")
+
+
+def save_report(report, path):
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
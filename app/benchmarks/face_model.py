@@ -0,0 +1,101 @@
+import csv
+import io
+import os
+import time
+import cv2
+import numpy as np
+import torch
+import torch.nn.functional as F
+from services import face_compare, face_model
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+
+def _rss_bytes():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return 0
+
+
+def _serialized_bytes(module):
+    buffer = io.BytesIO()
+    if isinstance(module, torch.jit.ScriptModule):
+        torch.jit.save(module, buffer)
+    else:
+        torch.save(module.state_dict(), buffer)
+    return buffer.tell()
+
+
+def load_pairs(source):
+    """
+    Read face pairs from a CSV (img1,img2 per line) or pair consecutive images of a folder.
+    """
+    if os.path.isdir(source):
+        files = sorted(os.path.join(source, f) for f in os.listdir(source) if f.lower().endswith(IMAGE_EXTENSIONS))
+        return [(files[i], files[i + 1]) for i in range(0, len(files) - 1, 2)]
+
+    with open(source) as f:
+        return [(row[0].strip(), row[1].strip()) for row in csv.reader(f) if len(row) >= 2]
+
+
+def _embed(module, face):
+    with torch.no_grad():
+        return module(face_compare.face_to_tensor(face, face_compare.device))
+
+
+def parity(pairs, variants, channels_last=False, threshold=1.0):
+    """
+    Compare each variant's distances and distance < threshold decisions against the fp32 model.
+    """
+    device = face_compare.device
+    reference = face_model.optimize(face_compare.get_model(), 'fp32', False, device)
+    faces = [(cv2.imread(a), cv2.imread(b)) for a, b in pairs]
+    faces = [(a, b) for a, b in faces if a is not None and b is not None]
+
+    baseline = [F.pairwise_distance(_embed(reference, a), _embed(reference, b)).item() for a, b in faces]
+
+    report = {"pairs": len(faces), "threshold": threshold, "variants": {}}
+    for variant in variants:
+        module = face_model.optimize(face_compare.get_model(), variant, channels_last, device)
+        distances = [F.pairwise_distance(_embed(module, a), _embed(module, b)).item() for a, b in faces]
+        deltas = np.abs(np.array(distances) - np.array(baseline)) if faces else np.zeros(0)
+        flipped = sum(1 for d, base in zip(distances, baseline) if (d < threshold) != (base < threshold))
+        report["variants"][variant] = {
+            "mean_abs_delta": float(deltas.mean()) if len(deltas) else 0.0,
+            "max_abs_delta": float(deltas.max()) if len(deltas) else 0.0,
+            "decisions_flipped": flipped
+        }
+    return report
+
+
+def benchmark(variants, channels_last=False, batch_sizes=(1, 16), iterations=50):
+    """
+    Measure per-sample latency, serialized size and resident memory growth of each variant.
+    """
+    device = face_compare.device
+    report = {}
+    for variant in variants:
+        rss_before = _rss_bytes()
+        module = face_model.optimize(face_compare.get_model(), variant, channels_last, device)
+        rss_after = _rss_bytes()
+
+        entry = {
+            "serialized_mb": round(_serialized_bytes(module) / 2 ** 20, 1),
+            "rss_delta_mb": round((rss_after - rss_before) / 2 ** 20, 1),
+            "latency_ms_per_sample": {}
+        }
+        for batch_size in batch_sizes:
+            batch = torch.randn(batch_size, 1, 100, 100, device=device)
+            timings = []
+            with torch.no_grad():
+                for _ in range(3):
+                    module(batch)
+                for _ in range(iterations):
+                    start = time.perf_counter()
+                    module(batch)
+                    timings.append((time.perf_counter() - start) * 1000 / batch_size)
+            entry["latency_ms_per_sample"][str(batch_size)] = round(float(np.median(timings)), 3)
+        report[variant] = entry
+    return report
@@ -0,0 +1,59 @@
+import os
+import time
+import cv2
+from services import back_normalize, front_ocr
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+
+def run(image_dir, aligned=False):
+    """
+    Run the per-field and mosaic front OCR modes on the same captures and report field mismatches.
+    """
+    rows = []
+    for filename in sorted(os.listdir(image_dir)):
+        if not filename.lower().endswith(IMAGE_EXTENSIONS):
+            continue
+        image = cv2.imread(os.path.join(image_dir, filename))
+        if image is None:
+            continue
+
+        normalized_image = image if aligned else back_normalize.align_card(image, 'front')
+        if normalized_image is None:
+            rows.append({"image": filename, "error": "Alignment failed"})
+            continue
+
+        start = time.perf_counter()
+        per_field = front_ocr.procesar_ocr_completo(normalized_image, mode='per_field')
+        per_field_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        mosaic = front_ocr.procesar_ocr_completo(normalized_image, mode='mosaic')
+        mosaic_ms = (time.perf_counter() - start) * 1000
+
+        mismatches = {
+            campo: {"per_field": per_field.get(campo), "mosaic": mosaic.get(campo)}
+            for campo in sorted(set(per_field) | set(mosaic))
+            if per_field.get(campo) != mosaic.get(campo)
+        }
+        rows.append({
+            "image": filename,
+            "per_field_ms": round(per_field_ms, 1),
+            "mosaic_ms": round(mosaic_ms, 1),
+            "mismatches": mismatches
+        })
+
+    return rows
+
+
+def print_report(rows):
+    compared = [row for row in rows if "error" not in row]
+    identical = sum(1 for row in compared if not row["mismatches"])
+    print(f"Imágenes comparadas: {len(compared)}, idénticas: {identical}, con diferencias: {len(compared) - identical}")
+    for row in rows:
+        if "error" in row:
+            print(f"  {row['image']}: {row['error']}")
+            continue
+        print(f"  {row['image']}: por campo {row['per_field_ms']} ms, mosaico {row['mosaic_ms']} ms")
+        for campo, values in row["mismatches"].items():
+            print(f"    {campo}: {values['per_field']!r} != {values['mosaic']!r}")
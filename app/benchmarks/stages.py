@@ -0,0 +1,153 @@
+import json
+import os
+import platform
+import time
+import cv2
+import numpy as np
+import torch
+import torch.nn.functional as F
+from benchmarks import synthetic_cards
+from services import back_normalize, back_ocr, detect_qr, face_compare, face_cropper, front_ocr, validate
+from settings import Config
+from utils import path_utils
+
+STAGES = ('align_front', 'align_back', 'procesar_ocr_completo', 'procesar_ocr_reverso', 'detect_qr',
+          'crop_faces', 'compare_faces', 'validate_data')
+
+
+def _percentiles(samples):
+    if not samples:
+        return {"count": 0}
+    values = np.array(samples)
+    mean = float(values.mean())
+    return {
+        "count": len(samples),
+        "mean_ms": round(mean, 2),
+        "p50_ms": round(float(np.percentile(values, 50)), 2),
+        "p95_ms": round(float(np.percentile(values, 95)), 2),
+        "p99_ms": round(float(np.percentile(values, 99)), 2),
+        "throughput_per_s": round(1000.0 / mean, 2) if mean else None
+    }
+
+
+def _compare_faces_uncached(face1, face2):
+    # Pasar por el modelo sin la caché de embeddings, para medir la inferencia
+    tensors = [face_compare.face_to_tensor(np.ascontiguousarray(face), face_compare.device) for face in (face1, face2)]
+    embedding1, embedding2 = [future.result() for future in face_compare.get_batcher().submit_many(tensors)]
+    return F.pairwise_distance(embedding1, embedding2).item()
+
+
+def run(count=20, seed=0, repeat=1, mode=None):
+    """
+    Time every pipeline stage separately on synthetic cards. A stage that raises is counted as a
+    failure and the stages that depend on its output are skipped for that card.
+    """
+    cards = synthetic_cards.generate(
+        path_utils.get_front_reference_images(), path_utils.get_back_reference_images(), count, seed)
+
+    timings = {stage: [] for stage in STAGES}
+    failures = {stage: 0 for stage in STAGES}
+
+    def timed(stage, fn, *args):
+        result = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            try:
+                result = fn(*args)
+            except Exception:
+                failures[stage] += 1
+                return None
+            timings[stage].append((time.perf_counter() - start) * 1000)
+        return result
+
+    # Calentar cachés y modelos con la primera tarjeta, fuera de la medición
+    back_normalize.align_card(cards[0]["front"], 'front', mode)
+    back_normalize.align_card(cards[0]["back"], 'back', mode)
+    face_compare.get_batcher()
+
+    start = time.perf_counter()
+    for card in cards:
+        front = timed('align_front', back_normalize.align_card, card["front"], 'front', mode)
+        back = timed('align_back', back_normalize.align_card, card["back"], 'back', mode)
+        if front is None or back is None:
+            continue
+
+        front_data = timed('procesar_ocr_completo', front_ocr.procesar_ocr_completo, front)
+        back_data = timed('procesar_ocr_reverso', back_ocr.procesar_ocr_reverso, back)
+        qr_value = timed('detect_qr', detect_qr.detect_qr, back)
+
+        faces = timed('crop_faces', face_cropper.crop_faces, front, False)
+        if faces is None:
+            continue
+        face1, face2, _, _ = faces
+        timed('compare_faces', _compare_faces_uncached, face1, face2)
+
+        if front_data is not None and back_data is not None:
+            datos_mrz = back_data.get("datosMRZ", back_data.get("text", {}).get("datosMRZ", {}))
+            timed('validate_data', validate.validate_data, front_data, datos_mrz,
+                  np.ascontiguousarray(face1), np.ascontiguousarray(face2), qr_value or "")
+    elapsed = time.perf_counter() - start
+
+    return {
+        "environment": {
+            "python": platform.python_version(),
+            "opencv": cv2.__version__,
+            "torch": torch.__version__,
+            "cpu_count": os.cpu_count(),
+            "torch_threads": torch.get_num_threads(),
+            "align_backend": back_normalize.resolve_backend(mode),
+            "front_ocr_mode": Config.FRONT_OCR_MODE,
+            "face_model_variant": Config.FACE_MODEL_VARIANT
+        },
+        "cards": count,
+        "seed": seed,
+        "repeat": repeat,
+        "cards_per_s": round(count / elapsed, 2),
+        "stages": {stage: dict(_percentiles(timings[stage]), failures=failures[stage]) for stage in STAGES}
+    }
+
+
+def compare(baseline, current, max_regression=0.2):
+    """
+    Compare the p50/p95 of each stage against a baseline report. Returns the rows and whether any
+    stage got slower than max_regression (relative) or started failing more.
+    """
+    rows, regressed = [], False
+    for stage in STAGES:
+        old, new = baseline["stages"].get(stage, {}), current["stages"].get(stage, {})
+        row = {"stage": stage}
+        for metric in ("p50_ms", "p95_ms"):
+            if old.get(metric) and new.get(metric):
+                change = new[metric] / old[metric] - 1
+                row[metric] = [old[metric], new[metric], round(change, 3)]
+                regressed |= metric == "p50_ms" and change > max_regression
+        if new.get("failures", 0) > old.get("failures", 0):
+            row["failures"] = [old.get("failures", 0), new["failures"]]
+            regressed = True
+        rows.append(row)
+    return rows, regressed
+
+
+def print_report(report):
+    print(f"{report['cards']} tarjetas sintéticas (seed {report['seed']}), {report['cards_per_s']} tarjetas/s")
+    print(f"{'etapa':24} {'n':>4} {'p50':>9} {'p95':>9} {'p99':>9} {'ops/s':>8} {'fallos':>6}")
+    for stage, stats in report["stages"].items():
+        if not stats.get("count"):
+            print(f"{stage:24} {0:>4} {'-':>9} {'-':>9} {'-':>9} {'-':>8} {stats['failures']:>6}")
+            continue
+        print(f"{stage:24} {stats['count']:>4} {stats['p50_ms']:>9.1f} {stats['p95_ms']:>9.1f} "
+              f"{stats['p99_ms']:>9.1f} {stats['throughput_per_s']:>8.1f} {stats['failures']:>6}")
+
+
+def print_comparison(rows):
+    for row in rows:
+        parts = [f"{metric} {values[0]:.1f} -> {values[1]:.1f} ({values[2]:+.0%})"
+                 for metric, values in row.items() if metric in ("p50_ms", "p95_ms")]
+        if "failures" in row:
+            parts.append(f"fallos {row['failures'][0]} -> {row['failures'][1]}")
+        print(f"{row['stage']:24} " + ", ".join(parts))
+
+
+def save_report(report, path):
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
@@ -0,0 +1,183 @@
+import json
+import os
+import cv2
+import numpy as np
+from services.front_ocr import segmentos
+
+MESES = ("ENE", "FEB", "MAR", "ABR", "MAYO", "JUN", "JUL", "AGO", "SEPT", "OCT", "NOV", "DIC")
+APELLIDOS = ("GONZALEZ", "MUNOZ", "ROJAS", "DIAZ", "PEREZ", "SOTO", "CONTRERAS", "SILVA", "MARTINEZ", "SEPULVEDA")
+NOMBRES = ("JUAN", "MARIA", "JOSE", "CAMILA", "PEDRO", "CONSTANZA", "DIEGO", "FRANCISCA", "ANDRES", "VALENTINA")
+
+# Zona MRZ del reverso y recuadros de las fotos en la cédula alineada (ver back_ocr y face_cropper)
+MRZ_BOX = (30, 345, 810, 490)
+QR_BOX = (620, 40, 800, 220)
+FACE_BOXES = ((30, 134, 0.25, 0.55), (705, 215, 0.075, 0.15))
+
+
+def run_check_digit(run):
+    """
+    Chilean RUN check digit (modulo 11).
+    """
+    total = sum(int(digit) * factor for digit, factor in zip(reversed(str(run)), [2, 3, 4, 5, 6, 7] * 2))
+    rest = 11 - total % 11
+    return {11: '0', 10: 'K'}.get(rest, str(rest))
+
+
+def mrz_check_digit(text):
+    """
+    ICAO 9303 check digit (weights 7, 3, 1).
+    """
+    values = [int(c) if c.isdigit() else (ord(c) - 55 if c.isalpha() else 0) for c in text]
+    return str(sum(value * (7, 3, 1)[i % 3] for i, value in enumerate(values)) % 10)
+
+
+def generate_identity(rng):
+    """
+    Random but internally consistent card data: front fields, MRZ lines and QR payload.
+    """
+    run = int(rng.integers(5_000_000, 25_000_000))
+    dv = run_check_digit(run)
+    documento = str(int(rng.integers(100_000_000, 999_999_999)))
+    nacimiento = (int(rng.integers(1, 29)), int(rng.integers(1, 13)), int(rng.integers(1950, 2006)))
+    vencimiento = (int(rng.integers(1, 29)), int(rng.integers(1, 13)), int(rng.integers(2026, 2035)))
+    emision = (vencimiento[0], vencimiento[1], vencimiento[2] - 10)
+    sexo = str(rng.choice(["M", "F"]))
+    paterno, materno = (str(value) for value in rng.choice(APELLIDOS, 2, replace=False))
+    nombres = " ".join(str(value) for value in rng.choice(NOMBRES, 2, replace=False))
+
+    def fecha(d, m, y):
+        return f"{d:02d} {MESES[m - 1]} {y}"
+
+    def yymmdd(d, m, y):
+        return f"{y % 100:02d}{m:02d}{d:02d}"
+
+    linea_1 = f"INCHL{documento}{mrz_check_digit(documento)}".ljust(30, '<')
+    fecha_nac, fecha_venc = yymmdd(*nacimiento), yymmdd(*vencimiento)
+    linea_2 = (f"{fecha_nac}{mrz_check_digit(fecha_nac)}{sexo}{fecha_venc}{mrz_check_digit(fecha_venc)}"
+               f"CHL{run}<{dv}").ljust(29, '<')
+    linea_2 += mrz_check_digit(linea_2)
+    linea_3 = f"{paterno}<{materno}<<{nombres.replace(' ', '<')}".ljust(30, '<')[:30]
+
+    # El parámetro mrz del QR son los dígitos de la MRZ tras "CHL", como los extrae validate
+    digitos_mrz = "".join(c for c in (linea_1 + linea_2).split("CHL", 1)[1][:10] if c.isdigit())
+
+    return {
+        "apellido_paterno": paterno,
+        "apellido_materno": materno,
+        "nombres": nombres,
+        "nacionalidad": "CHILENA",
+        "sexo": sexo,
+        "fecha_nacimiento": fecha(*nacimiento),
+        "numero_documento": f"{documento[:3]}.{documento[3:6]}.{documento[6:]}",
+        "fecha_emision": fecha(*emision),
+        "fecha_vencimiento": fecha(*vencimiento),
+        "numero_identificador": f"RUN {run:,}-{dv}".replace(",", "."),
+        "mrz": [linea_1, linea_2, linea_3],
+        "qr": (f"https://portal.sidiv.registrocivil.cl/docstatus?RUN={run}-{dv}&type=CEDULA"
+               f"&serial={documento}&mrz={digitos_mrz}")
+    }
+
+
+def _put_text(image, text, box, font=cv2.FONT_HERSHEY_DUPLEX, thickness=2):
+    # Borrar el recuadro con su color de fondo y escribir el texto ajustado a su alto y ancho
+    x1, y1, x2, y2 = box
+    region = image[y1:y2, x1:x2]
+    region[:] = np.median(region.reshape(-1, 3), axis=0)
+
+    (width, height), _ = cv2.getTextSize(text, font, 1.0, thickness)
+    scale = min((y2 - y1) * 0.7 / height, (x2 - x1) * 0.95 / width)
+    (_, height), baseline = cv2.getTextSize(text, font, scale, thickness)
+    origin = (x1 + 4, y1 + (y2 - y1 + height) // 2)
+    cv2.putText(image, text, origin, font, scale, (30, 30, 30), thickness, cv2.LINE_AA)
+
+
+def _synthetic_face(rng, size=(200, 240)):
+    width, height = size
+    face = np.full((height, width, 3), int(rng.integers(170, 230)), np.uint8)
+    skin = tuple(int(v) for v in rng.integers(90, 200, 3))
+    cv2.ellipse(face, (width // 2, height // 2), (width // 3, height * 2 // 5), 0, 0, 360, skin, -1)
+    for dx in (-1, 1):
+        cv2.circle(face, (width // 2 + dx * width // 8, height * 2 // 5), width // 20, (40, 40, 40), -1)
+    cv2.ellipse(face, (width // 2, height * 2 // 3), (width // 8, height // 20), 0, 0, 180, (60, 40, 120), 3)
+    return face
+
+
+def render_front(template, identity, rng):
+    card = template.copy()
+    for campo, box in segmentos.items():
+        _put_text(card, identity[campo], box)
+
+    height, width = card.shape[:2]
+    face = _synthetic_face(rng)
+    for x, y, fw, fh in FACE_BOXES:
+        w, h = int(width * fw), int(height * fh)
+        card[y:y + h, x:x + w] = cv2.resize(face, (w, h), interpolation=cv2.INTER_AREA)
+    return card
+
+
+def render_back(template, identity):
+    card = template.copy()
+    x1, y1, x2, y2 = MRZ_BOX
+    line_height = (y2 - y1) // 3
+    for i, line in enumerate(identity["mrz"]):
+        _put_text(card, line, (x1, y1 + i * line_height, x2, y1 + (i + 1) * line_height), cv2.FONT_HERSHEY_SIMPLEX)
+
+    qr = cv2.QRCodeEncoder.create().encode(identity["qr"])
+    qx1, qy1, qx2, qy2 = QR_BOX
+    card[qy1:qy2, qx1:qx2] = cv2.cvtColor(cv2.resize(qr, (qx2 - qx1, qy2 - qy1), interpolation=cv2.INTER_NEAREST),
+                                          cv2.COLOR_GRAY2BGR)
+    return card
+
+
+def distort(card, rng, max_shift=0.05, max_blur=1.5, scale_range=(1.0, 1.6)):
+    """
+    Simulate a capture: random perspective and scale on a noisy background, blur and lighting.
+    """
+    height, width = card.shape[:2]
+    scale = rng.uniform(*scale_range)
+    margin = int(max(width, height) * 0.1 * scale)
+    out_w, out_h = int(width * scale) + 2 * margin, int(height * scale) + 2 * margin
+
+    corners = np.float32([[0, 0], [width, 0], [width, height], [0, height]])
+    target = corners * scale + margin
+    target += rng.uniform(-max_shift, max_shift, target.shape) * np.float32([width, height]) * scale
+    M = cv2.getPerspectiveTransform(corners, target.astype(np.float32))
+
+    background = rng.integers(40, 120, (out_h, out_w, 3), dtype=np.uint8)
+    photo = cv2.warpPerspective(card, M, (out_w, out_h), dst=background, borderMode=cv2.BORDER_TRANSPARENT)
+
+    sigma = rng.uniform(0, max_blur)
+    if sigma > 0.3:
+        photo = cv2.GaussianBlur(photo, (0, 0), sigma)
+    gain, offset = rng.uniform(0.85, 1.1), rng.uniform(-15, 15)
+    return cv2.convertScaleAbs(photo, alpha=gain, beta=offset)
+
+
+def generate(front_templates, back_templates, count, seed=0, distorted=True):
+    """
+    Return count synthetic cards as dicts with identity, front and back images (BGR).
+    The same seed and templates always produce the same cards.
+    """
+    rng = np.random.default_rng(seed)
+    cards = []
+    for i in range(count):
+        identity = generate_identity(rng)
+        front = render_front(front_templates[i % len(front_templates)], identity, rng)
+        back = render_back(back_templates[i % len(back_templates)], identity)
+        if distorted:
+            front, back = distort(front, rng), distort(back, rng)
+        cards.append({"identity": identity, "front": front, "back": back})
+    return cards
+
+
+def save(cards, out_dir):
+    """
+    Write the cards as <out_dir>/<n>/front.png, back.png and identity.json (the bulk CLI layout).
+    """
+    for i, card in enumerate(cards):
+        card_dir = os.path.join(out_dir, f'{i:05d}')
+        os.makedirs(card_dir, exist_ok=True)
+        cv2.imwrite(os.path.join(card_dir, 'front.png'), card["front"])
+        cv2.imwrite(os.path.join(card_dir, 'back.png'), card["back"])
+        with open(os.path.join(card_dir, 'identity.json'), 'w') as f:
+            json.dump(card["identity"], f, indent=2, ensure_ascii=False)
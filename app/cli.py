@@ -0,0 +1,207 @@
+import argparse
+import json
+import sys
+from settings import Config
+from utils import feature_pack
+from utils.keypoint_backends import BACKENDS
+
+def build_features(args):
+    """
+    Build the front/back reference feature packs ahead of deployment.
+    """
+    folders = {
+        'front': Config.FRONT_REFERENCES_DIR,
+        'back': Config.BACK_REFERENCES_DIR
+    }
+    sides = ['front', 'back'] if args.side == 'all' else [args.side]
+    backends = list(BACKENDS) if args.backend == 'all' else [args.backend]
+
+    for side in sides:
+        for backend in backends:
+            pack_path = feature_pack.build_feature_pack(
+                folders[side], Config.FEATURE_PACK_DIR, f'{side}-{backend}', args.nfeatures, backend)
+            pack = feature_pack.load_feature_pack(pack_path)
+            print(f"{side}/{backend}: {len(pack)} referencias, {len(pack.descriptors)} descriptores -> {pack_path}")
+
+def bench_align(args):
+    """
+    Benchmark full-resolution vs pyramid alignment on a folder of captures.
+    """
+    from benchmarks import alignment
+
+    max_sides = [int(value) for value in args.max_sides.split(',')]
+    report = alignment.run(args.images, args.side, max_sides, args.refine_min_inliers, args.repeat, args.backend)
+    alignment.print_report(report)
+    if args.output:
+        alignment.save_report(report, args.output)
+
+def compare_ocr_modes(args):
+    """
+    Check that the mosaic front OCR mode matches the per-field mode on a regression set.
+    """
+    from benchmarks import ocr_modes
+
+    rows = ocr_modes.run(args.images, args.aligned)
+    ocr_modes.print_report(rows)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(rows, f, indent=2, ensure_ascii=False)
+    if any(row.get("mismatches") for row in rows):
+        sys.exit(1)
+
+def face_parity(args):
+    """
+    Report distance deltas and flipped decisions of the optimized face models against fp32.
+    """
+    from benchmarks import face_model as bench_face_model
+
+    pairs = bench_face_model.load_pairs(args.pairs)
+    report = bench_face_model.parity(pairs, args.variants.split(','), args.channels_last, args.threshold)
+    print(json.dumps(report, indent=2))
+    if any(entry["decisions_flipped"] for entry in report["variants"].values()):
+        sys.exit(1)
+
+def bench_face_model(args):
+    """
+    Benchmark latency and memory of the face model variants.
+    """
+    from benchmarks import face_model as bench_face_model
+
+    report = bench_face_model.benchmark(args.variants.split(','), args.channels_last, iterations=args.iterations)
+    print(json.dumps(report, indent=2))
+
+def export_face_model(args):
+    """
+    Export an optimized TorchScript face model artifact (load it with FACE_MODEL_ARTIFACT).
+    """
+    from services import face_compare, face_model
+
+    module = face_model.optimize(face_compare.get_model(), args.variant, args.channels_last, face_compare.device)
+    face_model.export(module, args.output)
+    print(f"{args.variant} -> {args.output}")
+
+def bulk(args):
+    """
+    Process a folder of card images offline, writing (and resuming) a JSONL file of results.
+    """
+    from services import bulk as bulk_runner
+    from services.back_normalize import InvalidMode
+
+    try:
+        summary = bulk_runner.run(
+            args.images, args.output, args.workers, args.side, args.mode, args.validate, args.faces_dir, args.retry_errors)
+    except InvalidMode as e:
+        print(e, file=sys.stderr)
+        sys.exit(2)
+    print(json.dumps(summary))
+
+def generate_cards(args):
+    """
+    Render synthetic front/back card images from the reference templates.
+    """
+    from benchmarks import synthetic_cards
+    from utils import path_utils
+
+    cards = synthetic_cards.generate(
+        path_utils.get_front_reference_images(), path_utils.get_back_reference_images(),
+        args.count, args.seed, not args.clean)
+    synthetic_cards.save(cards, args.output)
+    print(f"{len(cards)} tarjetas -> {args.output}")
+
+def bench_stages(args):
+    """
+    Time each pipeline stage on synthetic cards, optionally against a baseline report.
+    """
+    from benchmarks import stages
+
+    report = stages.run(args.count, args.seed, args.repeat, args.mode)
+    stages.print_report(report)
+    if args.output:
+        stages.save_report(report, args.output)
+    if args.baseline:
+        with open(args.baseline) as f:
+            rows, regressed = stages.compare(json.load(f), report, args.max_regression)
+        stages.print_comparison(rows)
+        if regressed:
+            sys.exit(1)
+
+def main():
+    parser = argparse.ArgumentParser(description="Herramientas de línea de comandos de biometria-back")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    parser_features = subparsers.add_parser('build-features', help="Precalcular el pack de características de las referencias")
+    parser_features.add_argument('--side', choices=['front', 'back', 'all'], default='all')
+    parser_features.add_argument('--backend', choices=list(BACKENDS) + ['all'], default='all')
+    parser_features.add_argument('--nfeatures', type=int, default=Config.FEATURE_PACK_NFEATURES)
+    parser_features.set_defaults(func=build_features)
+
+    parser_align = subparsers.add_parser('bench-align', help="Comparar latencia/precisión de la alineación piramidal")
+    parser_align.add_argument('images', help="Carpeta con capturas reales del carnet")
+    parser_align.add_argument('--side', choices=['front', 'back'], default='front')
+    parser_align.add_argument('--max-sides', default='800,1200,1600')
+    parser_align.add_argument('--refine-min-inliers', type=int, default=Config.ALIGN_REFINE_MIN_INLIERS)
+    parser_align.add_argument('--backend', choices=list(BACKENDS), default='sift')
+    parser_align.add_argument('--repeat', type=int, default=3)
+    parser_align.add_argument('--output', help="Guardar el informe completo en JSON")
+    parser_align.set_defaults(func=bench_align)
+
+    parser_modes = subparsers.add_parser('compare-ocr-modes', help="Comparar el OCR por campo con el modo mosaico")
+    parser_modes.add_argument('images', help="Carpeta con el set de regresión del frente")
+    parser_modes.add_argument('--aligned', action='store_true', help="Las imágenes ya están alineadas")
+    parser_modes.add_argument('--output', help="Guardar las diferencias en JSON")
+    parser_modes.set_defaults(func=compare_ocr_modes)
+
+    variants = 'fp32,int8,torchscript,int8_torchscript'
+
+    parser_parity = subparsers.add_parser('face-parity', help="Comparar las variantes optimizadas del modelo facial con fp32")
+    parser_parity.add_argument('pairs', help="CSV con pares img1,img2 o carpeta de caras (pares consecutivos)")
+    parser_parity.add_argument('--variants', default='int8,torchscript,int8_torchscript')
+    parser_parity.add_argument('--channels-last', action='store_true')
+    parser_parity.add_argument('--threshold', type=float, default=1.0)
+    parser_parity.set_defaults(func=face_parity)
+
+    parser_bench_face = subparsers.add_parser('bench-face-model', help="Latencia y memoria de las variantes del modelo facial")
+    parser_bench_face.add_argument('--variants', default=variants)
+    parser_bench_face.add_argument('--channels-last', action='store_true')
+    parser_bench_face.add_argument('--iterations', type=int, default=50)
+    parser_bench_face.set_defaults(func=bench_face_model)
+
+    parser_export = subparsers.add_parser('export-face-model', help="Exportar el modelo facial optimizado como TorchScript")
+    parser_export.add_argument('output')
+    parser_export.add_argument('--variant', choices=['torchscript', 'int8_torchscript'], default='int8_torchscript')
+    parser_export.add_argument('--channels-last', action='store_true')
+    parser_export.set_defaults(func=export_face_model)
+
+    parser_bulk = subparsers.add_parser('bulk', help="Procesar una carpeta de cédulas sin pasar por el servidor")
+    parser_bulk.add_argument('images', help="Carpeta con las imágenes (la cara se toma de la carpeta o del prefijo front/back)")
+    parser_bulk.add_argument('output', help="Archivo JSONL de resultados; si existe, se reanuda")
+    parser_bulk.add_argument('--workers', type=int, default=0, help="Procesos (por defecto, uno por núcleo)")
+    parser_bulk.add_argument('--side', choices=['front', 'back'], help="Cara por defecto si el nombre no la indica")
+    parser_bulk.add_argument('--mode', help="Modo de alineación (fast, accurate o un backend)")
+    parser_bulk.add_argument('--validate', action='store_true', help="Emparejar anverso y reverso de cada cédula y validarlos")
+    parser_bulk.add_argument('--faces-dir', help="Guardar aquí los recortes de las caras")
+    parser_bulk.add_argument('--retry-errors', action='store_true', help="Reprocesar también las tareas que fallaron")
+    parser_bulk.set_defaults(func=bulk)
+
+    parser_cards = subparsers.add_parser('generate-cards', help="Generar cédulas sintéticas a partir de las referencias")
+    parser_cards.add_argument('output')
+    parser_cards.add_argument('--count', type=int, default=20)
+    parser_cards.add_argument('--seed', type=int, default=0)
+    parser_cards.add_argument('--clean', action='store_true', help="Sin perspectiva, desenfoque ni fondo")
+    parser_cards.set_defaults(func=generate_cards)
+
+    parser_stages = subparsers.add_parser('bench-stages', help="Medir cada etapa del flujo con cédulas sintéticas")
+    parser_stages.add_argument('--count', type=int, default=20)
+    parser_stages.add_argument('--seed', type=int, default=0)
+    parser_stages.add_argument('--repeat', type=int, default=1)
+    parser_stages.add_argument('--mode', help="Modo de alineación (fast, accurate o un backend)")
+    parser_stages.add_argument('--output', help="Guardar el informe JSON")
+    parser_stages.add_argument('--baseline', help="Informe JSON anterior con el que comparar")
+    parser_stages.add_argument('--max-regression', type=float, default=0.2, help="Empeoramiento relativo del p50 tolerado")
+    parser_stages.set_defaults(func=bench_stages)
+
+    args = parser.parse_args()
+    args.func(args)
+
+if __name__ == '__main__':
+    main()
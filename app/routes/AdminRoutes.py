@@ -0,0 +1,27 @@
+from flask import Blueprint, abort, jsonify, request, send_file
+from settings import Config
+from utils import profiling
+
+main = Blueprint('admin_blueprint', __name__)
+
+
+@main.before_request
+def require_secret():
+    # Las rutas de administración solo existen para quien trae el secreto de perfilado
+    if not profiling.authorized(request.headers.get(Config.PROFILE_HEADER)):
+        abort(404)
+
+
+@main.route('/profiles')
+def list_profiles():
+    # Perfiles guardados, del más reciente al más antiguo, con su request ID y tiempos por etapa
+    return jsonify(profiling.list_profiles())
+
+
+@main.route('/profiles/<name>')
+def get_profile(name):
+    # <name>.prof se abre con pstats o snakeviz; <name>.json es el resumen
+    path = profiling.profile_path(name)
+    if path is None:
+        abort(404)
+    return send_file(path, as_attachment=name.endswith('.prof'))
@@ -0,0 +1,65 @@
+import io
+import json
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+from routes.OcrRoutes import mode_response
+from services import pipeline
+from services.back_normalize import InvalidMode, check_mode
+from utils import batch_input
+
+main = Blueprint('batch_blueprint', __name__)
+
+def take_stream(file):
+    # Flask cierra request.files al terminar la vista, antes de que se genere la respuesta:
+    # quedarse con el archivo subido para leerlo mientras se transmiten los resultados
+    stream = file.stream
+    file.stream = io.BytesIO()
+    return stream
+
+def multipart_items(default_side):
+    # Campos front/back: el nombre del campo indica la cara; images/archive: carpeta o prefijo del nombre
+    uploads = []
+    for side in batch_input.SIDES:
+        uploads += [(file.filename, side, take_stream(file)) for file in request.files.getlist(side)]
+    uploads += [(file.filename, batch_input.side_from_name(file.filename, default_side), take_stream(file))
+                for file in request.files.getlist('images')]
+    archives = [take_stream(file) for file in request.files.getlist('archive')]
+
+    def items():
+        for name, side, stream in uploads:
+            with stream:
+                yield name, side, stream.read()
+        for stream in archives:
+            with stream:
+                yield from batch_input.iter_archive(stream, default_side)
+    return items()
+
+def body_items(default_side):
+    # Cuerpo crudo: zip (necesita acceso aleatorio, se copia a un temporal) o tar leído en streaming
+    if request.mimetype in ('application/zip', 'application/x-zip-compressed'):
+        archive = batch_input.spool(iter(lambda: request.stream.read(64 * 1024), b''))
+    else:
+        archive = request.stream
+    yield from batch_input.iter_archive(archive, default_side)
+
+def ndjson(results):
+    for result in results:
+        yield json.dumps(result) + '\n'
+
+@main.route('/', methods=['POST'])
+def batch_route():
+    default_side = request.args.get('side')
+    try:
+        mode = check_mode(request.args.get('mode'))
+    except InvalidMode as e:
+        return mode_response(e)
+
+    if request.mimetype == 'multipart/form-data':
+        if not any(request.files.getlist(field) for field in (*batch_input.SIDES, 'images', 'archive')):
+            return jsonify({"error": "No images uploaded"}), 400
+        items = multipart_items(default_side)
+    else:
+        items = body_items(default_side)
+
+    # Una línea JSON por imagen en cuanto termina, sin esperar al resto del lote
+    results = pipeline.run_batch(items, mode)
+    return Response(stream_with_context(ndjson(results)), mimetype='application/x-ndjson')
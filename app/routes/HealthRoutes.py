@@ -0,0 +1,20 @@
+from flask import Blueprint, jsonify
+from services import lifecycle
+
+main = Blueprint('health_blueprint', __name__)
+
+
+@main.route('/healthz')
+def healthz():
+    # El proceso está vivo y atiende peticiones, aunque siga calentando
+    return jsonify({"status": "ok"}), 200
+
+
+@main.route('/readyz')
+def readyz():
+    # Solo listo cuando el modelo, las referencias y los motores OCR están cargados y calientes
+    status = lifecycle.status()
+    if not status["ready"]:
+        # Etapas que fallaron y agotaron sus reintentos: volver a lanzarlas en segundo plano
+        lifecycle.retry()
+    return jsonify(status), 200 if status["ready"] else 503
@@ -1,11 +1,19 @@
-from flask import Blueprint, send_from_directory
+from flask import Blueprint, jsonify, send_from_directory
+from utils import storage
 import os
 
 main = Blueprint('image_blueprint', __name__)
 
 
-@main.route('/<filename>')
+@main.route('/_stats')
+def get_storage_stats():
+    # Uso de las carpetas de almacenamiento temporal (archivos, bytes, desalojos)
+    return jsonify(storage.usage_stats())
+
+
+@main.route('/<path:filename>')
 def get_image(filename):
     # Aquí usamos una ruta absoluta a la carpeta static en la raíz del proyecto
+    # (los archivos están repartidos en subcarpetas según su hash)
     static_folder = os.path.join(os.path.dirname(__file__), '../../static')
-    return send_from_directory(static_folder, filename)
\ No newline at end of file
+    return send_from_directory(static_folder, filename)
@@ -0,0 +1,11 @@
+from flask import Blueprint, Response
+from utils import metrics
+
+main = Blueprint('metrics_blueprint', __name__)
+
+
+@main.route('/metrics')
+def metrics_route():
+    # Formato de texto de Prometheus, agregado entre workers si hay PROMETHEUS_MULTIPROC_DIR
+    body, content_type = metrics.render()
+    return Response(body, content_type=content_type)
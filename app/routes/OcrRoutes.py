@@ -1,11 +1,37 @@
+import functools
 from flask import Blueprint, jsonify, request
-from services import normalize, face_cropper, front_ocr, back_ocr, back_normalize, detect_qr
-from utils import image_utils, path_utils
-import os
+from services import pipeline
+from services.back_normalize import InvalidMode
+from services.quality import ImageQualityRejected
+from services.ocr_executor import ExecutorSaturated
+from utils import image_utils, profiling
+from settings import Config
 
 main = Blueprint('ocr_blueprint', __name__)
 
+def busy_response(error):
+    # El executor de OCR está saturado: rechazar rápido en lugar de acumular espera
+    response = jsonify({"error": "Service busy", "message": str(error)})
+    response.headers['Retry-After'] = str(Config.OCR_RETRY_AFTER_SECONDS)
+    return response, 503
+
+def quality_response(error):
+    # Captura rechazada antes de alinear: devolver los motivos para que el cliente pida otra foto
+    return jsonify({"error": "Image quality too low", "quality": error.report}), 422
+
+def mode_response(error):
+    # ?mode= desconocido: error del cliente, con los valores admitidos
+    return jsonify({"error": str(error), "allowed": error.allowed}), 400
+
+def profiled(view):
+    # Perfilar la ruta completa si la petición trae el secreto en la cabecera o cae en el muestreo
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        return profiling.profiled(view.__name__, request.headers.get(Config.PROFILE_HEADER), view, *args, **kwargs)
+    return wrapper
+
 @main.route('/front', methods=['POST'])
+@profiled
 def front_ocr_route():
     try:
         if 'image' not in request.files:
@@ -15,36 +41,27 @@ def front_ocr_route():
         file = request.files['image']
         image_cv2 = image_utils.read_image(file)
 
-        # Obtener las imágenes de referencia cacheadas
-        reference_images = path_utils.get_front_reference_images()
+        # Alinear, OCR, recorte de caras y almacenamiento de artefactos
+        return jsonify(pipeline.run_front(image_cv2, request.args.get('mode'))), 200
 
-        # Alinear la imagen con las imágenes de referencia
-        normalized_image = back_normalize.align_image_with_references(image_cv2, reference_images)
+    except InvalidMode as e:
+        return mode_response(e)
 
-        if normalized_image is None:
-            return jsonify({"error": "Alignment failed"}), 400
+    except ImageQualityRejected as e:
+        return quality_response(e)
 
-        # Procesar OCR completo usando el servicio OCR
-        resultado_ocr = front_ocr.procesar_ocr_completo(normalized_image)
+    except pipeline.AlignmentFailed as e:
+        return jsonify({"error": str(e)}), 400
 
-        # Guardar la imagen temporalmente en la carpeta tmp
-        temp_image_path = image_utils.save_image_temp(normalized_image)
-
-        # Recortar las caras y guardar las imágenes
-        face1, face2, face1_temp_path, face2_temp_path = face_cropper.crop_faces(normalized_image)
-
-        return jsonify({
-            "text": resultado_ocr,
-            "temp_image_path": temp_image_path,
-            "face1_temp_path": face1_temp_path,
-            "face2_temp_path": face2_temp_path
-        }), 200
+    except ExecutorSaturated as e:
+        return busy_response(e)
 
     except Exception as e:
         return jsonify({"error": "An error occurred", "message": str(e)}), 500
 
 
 @main.route('/back', methods=['POST'])
+@profiled
 def back_ocr_route():
     try:
         # Verificación de carga de imagen
@@ -55,28 +72,20 @@ def back_ocr_route():
         file = request.files['image']
         image_cv2 = image_utils.read_image(file)
 
-        # Obtener las imágenes de referencia cacheadas
-        reference_images = path_utils.get_back_reference_images()
-
-        # Alinear la imagen con las imágenes de referencia
-        normalized_image = back_normalize.align_image_with_references(image_cv2, reference_images)
-
-        if normalized_image is None:
-            return jsonify({"error": "Alignment failed"}), 400
+        # Alinear, OCR de la MRZ y lectura del QR
+        return jsonify(pipeline.run_back(image_cv2, request.args.get('mode'))), 200
 
-        # Procesar OCR en la imagen alineada
-        resultado_ocr = back_ocr.procesar_ocr_reverso(normalized_image)
-        qr_value = detect_qr.detect_qr(normalized_image)
+    except InvalidMode as e:
+        return mode_response(e)
 
+    except ImageQualityRejected as e:
+        return quality_response(e)
 
-        # Guardar la imagen alineada temporalmente
-        temp_image_path = image_utils.save_image_temp(normalized_image)
+    except pipeline.AlignmentFailed as e:
+        return jsonify({"error": str(e)}), 400
 
-        return jsonify({
-            "qr": qr_value,
-            "text": resultado_ocr,
-            "temp_image_path": temp_image_path
-        }), 200
+    except ExecutorSaturated as e:
+        return busy_response(e)
 
     except Exception as e:
         return jsonify({"error": "An error occurred", "message": str(e)}), 500
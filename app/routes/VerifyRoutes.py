@@ -0,0 +1,38 @@
+from flask import Blueprint, jsonify, request
+from routes.OcrRoutes import busy_response, mode_response, profiled, quality_response
+from services import pipeline
+from services.back_normalize import InvalidMode
+from services.ocr_executor import ExecutorSaturated
+from services.quality import ImageQualityRejected
+from utils import image_utils
+
+main = Blueprint('verify_blueprint', __name__)
+
+@main.route('/', methods=['POST'])
+@profiled
+def verify_route():
+    try:
+        # Ambas caras de la cédula en la misma petición
+        if 'front' not in request.files or 'back' not in request.files:
+            return jsonify({"error": "Both 'front' and 'back' images are required"}), 400
+
+        front_image = image_utils.read_image(request.files['front'])
+        back_image = image_utils.read_image(request.files['back'])
+
+        # Anverso y reverso en paralelo, después la validación en memoria
+        return jsonify(pipeline.run_verify(front_image, back_image, request.args.get('mode'))), 200
+
+    except InvalidMode as e:
+        return mode_response(e)
+
+    except ImageQualityRejected as e:
+        return quality_response(e)
+
+    except pipeline.AlignmentFailed as e:
+        return jsonify({"error": str(e)}), 400
+
+    except ExecutorSaturated as e:
+        return busy_response(e)
+
+    except Exception as e:
+        return jsonify({"error": "An error occurred", "message": str(e)}), 500
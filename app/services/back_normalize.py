@@ -1,35 +1,163 @@
 import cv2
 import numpy as np
+from services.reference_matcher import get_reference_matcher
+from settings import Config
+from utils import feature_pack, metrics, path_utils
+from utils.keypoint_backends import BACKENDS, get_backend
 
-def align_image_with_references(image, reference_images, nfeatures=5000, min_matches=20, ransac_threshold=5.0, lowe_ratio=0.7):
+# Modos de ?mode= además de los nombres de backend
+ALIGN_MODES = ('fast', 'accurate')
+
+
+class InvalidMode(ValueError):
+    """
+    Raised when a request asks for an alignment mode that does not exist; allowed lists the valid ones.
+    """
+
+    def __init__(self, mode):
+        self.allowed = [*ALIGN_MODES, *BACKENDS]
+        super().__init__(f"Unknown mode '{mode}'. Allowed: {', '.join(self.allowed)}")
+
+def estimate_alignment(image, reference_features, nfeatures=5000, min_matches=20, ransac_threshold=5.0, lowe_ratio=0.7, max_candidates=2):
     """
-    Aligns the given image (as a numpy array) with cached reference images using SIFT.
+    Estimate the homography that maps the image onto the best matching reference.
+    The detector is the one the feature pack was built with.
+    Returns (M, (height, width), inliers) or (None, None, 0) when no reference matches.
     """
     gray_original = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-    sift = cv2.SIFT_create(nfeatures=nfeatures)
+    backend = get_backend(reference_features.manifest['detector'])
 
-    keypoints_original, descriptors_original = sift.detectAndCompute(gray_original, None)
-    best_aligned_image = None
-    max_inliers = 0
+    with metrics.timer('extract'):
+        keypoints_original, descriptors_original = backend.detect_and_compute(gray_original, nfeatures)
+    if descriptors_original is None:
+        return None, None, 0
 
-    for image_reference in reference_images:
-        gray_reference = cv2.cvtColor(image_reference, cv2.COLOR_BGR2GRAY)
-        keypoints_ref, descriptors_ref = sift.detectAndCompute(gray_reference, None)
+    # Una sola consulta contra el índice combinado; cada coincidencia vota por su referencia
+    with metrics.timer('match'):
+        votes = get_reference_matcher(reference_features).vote(descriptors_original, lowe_ratio)
+    candidates = sorted(votes.items(), key=lambda item: len(item[1]), reverse=True)[:max_candidates]
 
-        flann = cv2.FlannBasedMatcher(dict(algorithm=1, trees=5), dict(checks=50))
-        matches = flann.knnMatch(descriptors_original, descriptors_ref, k=2)
+    best_M, best_shape = None, None
+    max_inliers = 0
 
-        good_matches = [m for m, n in matches if m.distance < lowe_ratio * n.distance]
+    # RANSAC solo para las referencias más votadas
+    for reference_index, good_matches in candidates:
+        if len(good_matches) <= min_matches:
+            continue
 
-        if len(good_matches) > min_matches:
-            src_pts = np.float32([keypoints_original[m.queryIdx].pt for m in good_matches]).reshape(-1, 1, 2)
-            dst_pts = np.float32([keypoints_ref[m.trainIdx].pt for m in good_matches]).reshape(-1, 1, 2)
+        points_ref = reference_features.reference_points(reference_index)
+        src_pts = np.float32([keypoints_original[query_idx].pt for query_idx, _ in good_matches]).reshape(-1, 1, 2)
+        dst_pts = np.float32([points_ref[train_idx] for _, train_idx in good_matches]).reshape(-1, 1, 2)
 
+        with metrics.timer('homography'):
             M, mask = cv2.findHomography(src_pts, dst_pts, cv2.RANSAC, ransac_threshold)
-            inliers = np.sum(mask) if mask is not None else 0
+        inliers = int(np.sum(mask)) if mask is not None else 0
+
+        if M is not None and inliers > max_inliers:
+            max_inliers = inliers
+            best_M = M
+            best_shape = reference_features.reference_shape(reference_index)
+
+    return best_M, best_shape, max_inliers
+
+def scale_to_max_side(image, max_side):
+    """
+    Downscale the image so its long side is at most max_side. Returns (image, scale).
+    """
+    height, width = image.shape[:2]
+    scale = min(1.0, max_side / float(max(height, width)))
+    if scale >= 1.0:
+        return image, 1.0
+
+    resized = cv2.resize(image, (int(round(width * scale)), int(round(height * scale))), interpolation=cv2.INTER_AREA)
+    return resized, scale
+
+def estimate_alignment_pyramid(image, reference_features, max_side=1600, refine_min_inliers=40, **kwargs):
+    """
+    Coarse-to-fine alignment: estimate the homography on a copy capped at max_side and only
+    refine at twice that resolution when the inlier count is marginal. The returned homography
+    maps original-resolution pixels onto the reference.
+    """
+    small, scale = scale_to_max_side(image, max_side)
+    M, shape, inliers = estimate_alignment(small, reference_features, **kwargs)
+
+    if inliers < refine_min_inliers and scale < 1.0:
+        fine, fine_scale = scale_to_max_side(image, max_side * 2)
+        M_fine, shape_fine, inliers_fine = estimate_alignment(fine, reference_features, **kwargs)
+        if M_fine is not None and inliers_fine > inliers:
+            M, shape, inliers, scale = M_fine, shape_fine, inliers_fine, fine_scale
+
+    if M is None:
+        return None, None, 0
+
+    # Componer con el escalado para poder deformar los píxeles originales
+    S = np.diag([scale, scale, 1.0])
+    return M @ S, shape, inliers
+
+def _estimate(image, reference_features, max_side, refine_min_inliers, params):
+    if max_side > 0:
+        return estimate_alignment_pyramid(image, reference_features, max_side, refine_min_inliers, **params)
+    return estimate_alignment(image, reference_features, **params)
+
+def align_image_with_references(image, reference_images=None, nfeatures=5000, min_matches=20, ransac_threshold=5.0, lowe_ratio=0.7, reference_features=None, max_side=0, refine_min_inliers=40, backend='sift'):
+    """
+    Aligns the given image (as a numpy array) with cached reference images using SIFT
+    (or the backend the feature pack was built with).
+    When a precomputed feature pack is given, only the uploaded image is run through the detector.
+    A positive max_side enables the coarse-to-fine pyramid mode.
+    """
+    if reference_features is None:
+        reference_features = feature_pack.features_from_images(reference_images, nfeatures, backend)
+
+    params = dict(nfeatures=nfeatures, min_matches=min_matches, ransac_threshold=ransac_threshold, lowe_ratio=lowe_ratio)
+    M, shape, _ = _estimate(image, reference_features, max_side, refine_min_inliers, params)
+
+    if M is None:
+        return None
+
+    height, width = shape
+    with metrics.timer('warp'):
+        return cv2.warpPerspective(image, M, (width, height))
+
+def check_mode(mode):
+    """
+    Validate a request mode (?mode=fast, ?mode=accurate or a backend name); raises InvalidMode.
+    """
+    if mode and mode not in ALIGN_MODES and mode not in BACKENDS:
+        raise InvalidMode(mode)
+    return mode
+
+def resolve_backend(mode=None):
+    """
+    Map a request mode (?mode=fast, ?mode=accurate or a backend name) to a keypoint backend.
+    """
+    if mode == 'fast':
+        return Config.ALIGN_FAST_BACKEND
+    if mode == 'accurate':
+        return 'sift'
+    if check_mode(mode):
+        return mode
+    return Config.ALIGN_BACKEND
+
+def align_card(image, side, mode=None):
+    """
+    Align an upload against the configured front/back references.
+    Cheaper backends fall back to SIFT when they find too few inliers.
+    """
+    get_features = path_utils.get_front_reference_features if side == 'front' else path_utils.get_back_reference_features
+    backend = resolve_backend(mode)
+    params = dict(nfeatures=Config.FEATURE_PACK_NFEATURES)
+
+    M, shape, inliers = _estimate(image, get_features(backend), Config.ALIGN_MAX_SIDE, Config.ALIGN_REFINE_MIN_INLIERS, params)
+
+    if backend != 'sift' and (M is None or inliers < Config.ALIGN_FALLBACK_MIN_INLIERS):
+        backend = 'sift'
+        M, shape, inliers = _estimate(image, get_features(backend), Config.ALIGN_MAX_SIDE, Config.ALIGN_REFINE_MIN_INLIERS, params)
 
-            if inliers > max_inliers:
-                max_inliers = inliers
-                best_aligned_image = cv2.warpPerspective(image, M, (image_reference.shape[1], image_reference.shape[0]))
+    metrics.observe_alignment(side, backend, inliers, M is not None)
+    if M is None:
+        return None
 
-    return best_aligned_image
+    height, width = shape
+    with metrics.timer('warp'):
+        return cv2.warpPerspective(image, M, (width, height))
@@ -1,11 +1,19 @@
 import cv2
-import pytesseract
+import numpy as np
 import re
 import json
 import os
+from services import ocr_engine, ocr_executor
+from settings import Config
+from utils import metrics
+from utils.logger import logger
 
-# Configuración de Tesseract
-pytesseract.pytesseract.tesseract_cmd = r'/usr/local/bin/tesseract'
+# Caracteres posibles en una MRZ (ICAO 9303)
+MRZ_WHITELIST = "ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789<"
+MRZ_LINEAS = 3
+# Largo de cada línea de una MRZ TD1 (cédula) y desviación tolerada en el texto reconocido
+MRZ_LARGO_LINEA = 30
+MRZ_TOLERANCIA_LARGO = 2
 
 # Función para detectar problemas de flash en la zona MRZ
 def detectar_problemas_flash_mrz(image, x1, y1, x2, y2, umbral_brillo=240, area_minima=500):
@@ -33,8 +41,119 @@ def resize_image(image, scale):
 
 # Función para realizar OCR en la MRZ
 def realizar_ocr_mrz(image):
-    config = "--psm 1 --oem 1"
-    return pytesseract.image_to_string(image, config=config, lang='mrz').strip()
+    return ocr_engine.image_to_string(image, lang='mrz', psm=1, oem=1).strip()
+
+def realizar_ocr_linea_mrz(image):
+    """
+    Reconoce una sola línea de la MRZ (--psm 7), limitada a los caracteres de la MRZ.
+    """
+    texto = ocr_engine.image_to_string(image, lang='mrz', psm=7, oem=1,
+                                       variables={"tessedit_char_whitelist": MRZ_WHITELIST})
+    return "".join(texto.split())
+
+def segmentar_lineas_mrz(binarizado, lineas=MRZ_LINEAS, umbral=0.1, alto_minimo=8,
+                         proporcion_alto=1.5, tinta_maxima=0.85):
+    """
+    Encuentra las franjas de texto de la MRZ con el perfil de proyección horizontal (tinta por fila)
+    del recorte binarizado. Retorna [(y_inicio, y_fin), ...] de arriba abajo, o None si no hay
+    exactamente `lineas` franjas, si sus altos difieren más de proporcion_alto veces o si alguna
+    es casi toda tinta (zona oscura o sombra en lugar de texto).
+    """
+    perfil = np.count_nonzero(binarizado < 128, axis=1)
+    if perfil.max() == 0:
+        return None
+
+    # Filas con tinta y bordes de cada tramo continuo
+    activas = np.concatenate(([0], (perfil > perfil.max() * umbral).astype(np.int8), [0]))
+    cambios = np.flatnonzero(np.diff(activas))
+    franjas = [(int(y0), int(y1)) for y0, y1 in zip(cambios[::2], cambios[1::2]) if y1 - y0 >= alto_minimo]
+    # Franjas casi todo tinta: zona oscura, sombra o borde, no texto (el texto deja huecos entre caracteres)
+    franjas = [(y0, y1) for y0, y1 in franjas if perfil[y0:y1].mean() <= tinta_maxima * binarizado.shape[1]]
+    if not franjas:
+        return None
+
+    # Líneas pegadas: partir la franja más alta en tantas líneas como quepan según el alto de las demás
+    while len(franjas) < lineas:
+        indice = max(range(len(franjas)), key=lambda i: franjas[i][1] - franjas[i][0])
+        y0, y1 = franjas[indice]
+        otras = [fin - inicio for j, (inicio, fin) in enumerate(franjas) if j != indice]
+        faltantes = lineas - len(franjas) + 1
+        partes = min(faltantes, round((y1 - y0) / np.median(otras))) if otras else faltantes
+        if partes < 2:
+            break
+        franjas[indice:indice + 1] = _partir_franja(perfil, y0, y1, partes)
+
+    # Ruido o bordes de la tarjeta: quedarse con las franjas con más tinta, en su orden vertical
+    if len(franjas) > lineas:
+        franjas = sorted(sorted(franjas, key=lambda f: perfil[f[0]:f[1]].sum(), reverse=True)[:lineas])
+
+    if len(franjas) != lineas:
+        return None
+
+    # Las líneas de una MRZ miden lo mismo: altos muy distintos indican un corte arbitrario
+    altos = [y1 - y0 for y0, y1 in franjas]
+    return franjas if max(altos) <= proporcion_alto * min(altos) else None
+
+def linea_mrz_valida(linea):
+    return abs(len(linea) - MRZ_LARGO_LINEA) <= MRZ_TOLERANCIA_LARGO
+
+def _partir_franja(perfil, y0, y1, partes):
+    # Cortar en el mínimo del perfil alrededor de cada división proporcional
+    paso = (y1 - y0) / partes
+    cortes = [y0]
+    for k in range(1, partes):
+        inicio, fin = int(y0 + (k - 0.3) * paso), int(y0 + (k + 0.3) * paso)
+        cortes.append(inicio + int(np.argmin(perfil[inicio:fin])))
+    cortes.append(y1)
+    return list(zip(cortes[:-1], cortes[1:]))
+
+def preparar_linea_mrz(gris, binarizado, franja, alto_objetivo, margen=4):
+    """
+    Recorta una línea de la MRZ ajustada a su tinta, la escala para que el texto mida alto_objetivo
+    píxeles y la binariza con su propio umbral.
+    """
+    y0, y1 = franja
+    columnas = np.flatnonzero(np.count_nonzero(binarizado[y0:y1] < 128, axis=0))
+    x0, x1 = (int(columnas[0]), int(columnas[-1]) + 1) if columnas.size else (0, gris.shape[1])
+
+    y0, y1 = max(0, y0 - margen), min(gris.shape[0], y1 + margen)
+    x0, x1 = max(0, x0 - margen), min(gris.shape[1], x1 + margen)
+    linea = gris[y0:y1, x0:x1]
+
+    escala = alto_objetivo / max(1, franja[1] - franja[0])
+    linea = cv2.resize(linea, None, fx=escala, fy=escala,
+                       interpolation=cv2.INTER_CUBIC if escala > 1 else cv2.INTER_AREA)
+    _, linea = cv2.threshold(linea, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+
+    # Borde blanco: Tesseract reconoce peor el texto pegado al borde
+    return cv2.copyMakeBorder(linea, 10, 10, 10, 10, cv2.BORDER_CONSTANT, value=255)
+
+def ocr_mrz_por_lineas(zona_mrz):
+    """
+    Segmenta las tres líneas de la MRZ y las reconoce en paralelo en el executor de OCR.
+    Retorna las líneas reconocidas o None si no se pudieron segmentar.
+    """
+    gris = cv2.cvtColor(zona_mrz, cv2.COLOR_BGR2GRAY)
+    _, binarizado = cv2.threshold(gris, 128, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+
+    franjas = segmentar_lineas_mrz(binarizado)
+    if franjas is None:
+        return None
+
+    llamadas = [
+        (realizar_ocr_linea_mrz, (preparar_linea_mrz(gris, binarizado, franja, Config.MRZ_LINE_HEIGHT),))
+        for franja in franjas
+    ]
+    return [futuro.result() for futuro in ocr_executor.submit_all(llamadas)]
+
+def ocr_mrz_bloque(zona_mrz):
+    """
+    Reconoce toda la zona MRZ ampliada 5x en una sola llamada (--psm 1) y separa sus líneas.
+    """
+    zona_mrz_preprocesada = preprocesar_segmento(zona_mrz)
+    resized = resize_image(zona_mrz_preprocesada, 5)
+    texto_ocr = ocr_executor.submit(realizar_ocr_mrz, resized).result()
+    return texto_ocr.split("\n")
 
 # Funciones auxiliares para extraer datos
 def extraer_numerodoc_mrz(linea_raw):
@@ -106,10 +225,13 @@ def corregir_caracteres_especificos(texto):
     return ''.join(correcciones.get(char, char) for char in texto)
 
 # Función principal para procesar el reverso de la cédula
-def procesar_ocr_reverso(image):
+def procesar_ocr_reverso(image, mode=None):
+    """
+    Reconoce la MRZ del reverso alineado. El modo ('lines' o 'block') se toma de MRZ_OCR_MODE si no se indica.
+    """
     # Coordenadas únicas del segmento MRZ
     x1, y1, x2, y2 = 30, 345, 810, 490
-    print(f"Coordenadas del segmento MRZ: x1={x1}, y1={y1}, x2={x2}, y2={y2}")
+    logger.debug("Segmento MRZ", extra={"box": [x1, y1, x2, y2]})
 
     # Extraer la zona MRZ completa
     zona_mrz = image[y1:y2, x1:x2]
@@ -125,14 +247,19 @@ def procesar_ocr_reverso(image):
             }
         }
 
-    # Preprocesar la imagen de la MRZ
-    zona_mrz_preprocesada = preprocesar_segmento(zona_mrz)
-    resized = resize_image(zona_mrz_preprocesada, 5)
-
-    # Realizar OCR en la MRZ
-    texto_ocr = realizar_ocr_mrz(resized)
-    texto_ocr = corregir_caracteres_especificos(texto_ocr)
-    lineas = texto_ocr.split("\n")
+    # Realizar OCR en la MRZ: por líneas y, si no se encuentran las tres, sobre toda la zona
+    with metrics.timer('ocr_mrz'):
+        lineas = None
+        if (mode or Config.MRZ_OCR_MODE) == 'lines':
+            lineas = ocr_mrz_por_lineas(zona_mrz)
+            # Solo se da por buena si las tres líneas tienen el largo de una MRZ TD1
+            if lineas is not None and not all(linea_mrz_valida(linea) for linea in lineas):
+                lineas = None
+            if lineas is None:
+                logger.info("MRZ sin tres líneas válidas por segmentación; reintentando sobre toda la zona")
+        if lineas is None:
+            lineas = ocr_mrz_bloque(zona_mrz)
+    lineas = [corregir_caracteres_especificos(linea) for linea in lineas]
     lineas = [linea for linea in lineas if len(linea.strip()) > 10]
 
     if len(lineas) < 3:
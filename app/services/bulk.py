@@ -0,0 +1,189 @@
+import json
+import multiprocessing
+import os
+import time
+import cv2
+from settings import Config
+from utils import batch_input
+from utils.logger import logger
+
+_options = {}
+
+
+def card_key(relative_path):
+    """
+    Identify the card an image belongs to, so that the front and back of a card pair up:
+    <card>/front.jpg, front/<card>.jpg and front_<card>.jpg all map to <card>.
+    """
+    parts = relative_path.replace('\\', '/').split('/')
+    stem = os.path.splitext(parts[-1])[0]
+    for side in batch_input.SIDES:
+        if stem.lower().startswith(side):
+            stem = stem[len(side):].lstrip('_- ')
+            break
+    folders = [part for part in parts[:-1] if part.lower() not in batch_input.SIDES]
+    return '/'.join(folders + ([stem] if stem else []))
+
+
+def find_images(root, default_side=None):
+    """
+    Return (relative path, side) for every image under root, sorted by path.
+    """
+    images = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            path = os.path.relpath(os.path.join(dirpath, filename), root)
+            if batch_input.is_image(path):
+                images.append((path, batch_input.side_from_name(path, default_side)))
+    return images
+
+
+def plan_tasks(images, validate=False):
+    """
+    Group the images into tasks: one per image, or one per card (front + back) when validating.
+    """
+    if not validate:
+        return [{"key": path, "images": {side: path}} for path, side in images]
+
+    cards = {}
+    for path, side in images:
+        cards.setdefault(card_key(path), {})[side] = path
+    return [{"key": key, "images": sides} for key, sides in sorted(cards.items())]
+
+
+def load_done(output):
+    """
+    Read the keys already written to a JSONL output, with their status. A line truncated by a
+    crash is ignored, so its task runs again.
+    """
+    done = {}
+    if not os.path.exists(output):
+        return done
+    with open(output, encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            done[record.get("key")] = record.get("status")
+    return done
+
+
+def _init_worker(options):
+    # Cada proceso ya es una unidad de paralelismo: sin hilos extra de OCR, OpenCV ni torch
+    _options.update(options)
+    Config.OCR_EXECUTOR_MODE = 'thread'
+    Config.OCR_EXECUTOR_WORKERS = 1
+    Config.FACE_BATCH_MAX_WAIT_MS = 0
+    Config.LEGACY_TEMP_FILES = False
+    cv2.setNumThreads(1)
+    if options["validate"]:
+        import torch
+        torch.set_num_threads(1)
+
+
+def _save_faces(key, face1, face2):
+    faces_dir = _options.get("faces_dir")
+    if not faces_dir:
+        return None
+    base = os.path.join(faces_dir, key.replace('/', '__'))
+    os.makedirs(faces_dir, exist_ok=True)
+    paths = [f'{base}_face1.jpg', f'{base}_face2.jpg']
+    cv2.imwrite(paths[0], face1)
+    cv2.imwrite(paths[1], face2)
+    return paths
+
+
+def _process_side(side, path):
+    from services import pipeline
+
+    if side not in batch_input.SIDES:
+        raise ValueError("Unknown side; use a front/back folder or file name prefix, or --side")
+    image = cv2.imread(os.path.join(_options["root"], path))
+    if image is None:
+        raise ValueError("Could not decode image")
+
+    if side == 'front':
+        _, text, face1, face2 = pipeline.process_front(image, _options["mode"])
+        return {"text": text}, (face1, face2)
+    _, text, qr_value = pipeline.process_back(image, _options["mode"])
+    return {"qr": qr_value, "text": text}, None
+
+
+def run_task(task):
+    """
+    Process one task in a worker process and return its JSONL record.
+    """
+    from services import pipeline
+
+    start = time.perf_counter()
+    record = {"key": task["key"], "images": task["images"], "status": "ok"}
+    try:
+        faces = None
+        for side, path in sorted(task["images"].items(), key=lambda item: str(item[0])):
+            record[side or "unknown"], side_faces = _process_side(side, path)
+            faces = side_faces or faces
+
+        if faces is not None:
+            record["faces"] = _save_faces(task["key"], *faces)
+
+        if _options["validate"]:
+            if "front" not in record or "back" not in record:
+                raise ValueError("Validation needs both the front and the back of the card")
+            back_text = record["back"]["text"]
+            datos_mrz = back_text.get("datosMRZ", back_text.get("text", {}).get("datosMRZ", {}))
+            record["validation"] = pipeline.validate_card(
+                record["front"]["text"], datos_mrz, faces[0], faces[1], record["back"]["qr"] or "")
+    except Exception as e:
+        record["status"] = "error"
+        record["error"] = str(e)
+    record["seconds"] = round(time.perf_counter() - start, 3)
+    return record
+
+
+def run(root, output, workers=0, side=None, mode=None, validate=False, faces_dir=None, retry_errors=False):
+    """
+    Process every image under root on a process pool, appending one JSONL record per task to
+    output as soon as it finishes. Tasks already in output are skipped, so an interrupted run
+    resumes where it stopped. Returns a summary dict. Raises InvalidMode for an unknown mode.
+    """
+    from services import back_normalize
+
+    # Un modo inválido haría fallar todas las tareas y quedarían registradas como hechas
+    back_normalize.check_mode(mode)
+
+    tasks = plan_tasks(find_images(root, side), validate)
+    done = load_done(output)
+    pending = [task for task in tasks
+               if task["key"] not in done or (retry_errors and done[task["key"]] != "ok")]
+
+    summary = {"tasks": len(tasks), "skipped": len(tasks) - len(pending), "ok": 0, "error": 0}
+    if not pending:
+        return summary
+
+    # Si el proceso anterior murió a mitad de línea, empezar en una línea nueva
+    if os.path.exists(output) and os.path.getsize(output) > 0:
+        with open(output, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            needs_newline = f.read(1) != b'\n'
+    else:
+        needs_newline = False
+
+    options = {"root": root, "mode": mode, "validate": validate, "faces_dir": faces_dir}
+    start = time.perf_counter()
+    with open(output, 'a', encoding='utf-8') as out, \
+            multiprocessing.Pool(workers or os.cpu_count(), _init_worker, (options,)) as pool:
+        if needs_newline:
+            out.write('\n')
+        for count, record in enumerate(pool.imap_unordered(run_task, pending), 1):
+            out.write(json.dumps(record, ensure_ascii=False) + '\n')
+            out.flush()
+            summary[record["status"]] += 1
+            if count % 50 == 0 or count == len(pending):
+                rate = count / (time.perf_counter() - start)
+                logger.info(f"{count}/{len(pending)} procesadas ({rate:.1f}/s), {summary['error']} con error",
+                            extra={"done": count, "pending": len(pending), "rate": round(rate, 2), "errors": summary['error']})
+
+    summary["seconds"] = round(time.perf_counter() - start, 1)
+    return summary
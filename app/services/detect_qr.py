@@ -1,35 +1,37 @@
 import cv2
 from pyzbar.pyzbar import decode
 import re
+from utils import metrics
+from utils.logger import logger
 
 # Función para detectar el QR en la imagen
 def detect_qr(image):
     # Verificación de la carga de imagen
     if image is None:
-        print("Error: La imagen no se ha cargado correctamente.", flush=True)
+        logger.warning("La imagen no se ha cargado correctamente.")
         return None
 
-    imagen_gris = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-    imagen_gris = cv2.GaussianBlur(imagen_gris, (5, 5), 0)
-    imagen_procesada = cv2.adaptiveThreshold(
-        imagen_gris, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2
-    )
+    with metrics.timer('qr_decode'):
+        imagen_gris = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        imagen_gris = cv2.GaussianBlur(imagen_gris, (5, 5), 0)
+        imagen_procesada = cv2.adaptiveThreshold(
+            imagen_gris, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2
+        )
 
-    codigos_qr = decode(imagen_procesada)
+        codigos_qr = decode(imagen_procesada)
 
     if not codigos_qr:
-        print("No se encontraron códigos QR en la imagen.", flush=True)
+        logger.info("No se encontraron códigos QR en la imagen.")
         return None
 
     # Paso 5: Verificación del contenido del QR
     for codigo in codigos_qr:
         data = codigo.data.decode('utf-8')
-        print("Datos del QR detectado:", data, flush=True)
         if es_url(data):
-            print("El QR contiene una URL válida:", data, flush=True)
+            logger.debug("QR con URL válida", extra={"qr": data})
             return data
         else:
-            print("El QR no contiene una URL válida.", flush=True)
+            logger.info("El QR no contiene una URL válida.", extra={"qr": data})
 
     return None
 
@@ -0,0 +1,87 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+import torch
+from utils import metrics
+
+
+class InferenceBatcher:
+    """
+    Collects face tensors from concurrent requests and runs them through the model as one batch.
+
+    A batch is dispatched once it reaches max_batch samples or max_wait_ms after its first sample
+    arrived, whichever comes first. Each submitted tensor gets its own future holding its row of
+    the batched output.
+    """
+
+    def __init__(self, forward, max_batch=16, max_wait_ms=5.0, name='face-batcher'):
+        self.forward = forward
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.name = name
+        self._queue = deque()
+        self._condition = threading.Condition()
+        self._thread = None
+        self._running = 0
+        self.batches = 0
+        self.samples = 0
+
+    def submit_many(self, tensors):
+        """
+        Queue (1, C, H, W) tensors and return one future per tensor.
+        """
+        futures = [Future() for _ in tensors]
+        with self._condition:
+            self._ensure_thread()
+            self._queue.extend(zip(tensors, futures))
+            self._condition.notify()
+        return futures
+
+    def submit(self, tensor):
+        return self.submit_many([tensor])[0]
+
+    def stats(self):
+        return {"pending": len(self._queue), "running": self._running}
+
+    def _ensure_thread(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name=self.name, daemon=True)
+            self._thread.start()
+
+    def _collect(self):
+        with self._condition:
+            while not self._queue:
+                self._condition.wait()
+
+            # Esperar como máximo max_wait desde la primera muestra para llenar el lote
+            deadline = time.monotonic() + self.max_wait
+            while len(self._queue) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+
+            count = min(len(self._queue), self.max_batch)
+            return [self._queue.popleft() for _ in range(count)]
+
+    def _loop(self):
+        while True:
+            batch = self._collect()
+            tensors = [tensor for tensor, _ in batch]
+            futures = [future for _, future in batch]
+            self._running = len(batch)
+            try:
+                with metrics.timer('face_embed'), torch.no_grad():
+                    output = self.forward(torch.cat(tensors, dim=0))
+            except BaseException as e:
+                for future in futures:
+                    future.set_exception(e)
+                continue
+            finally:
+                self._running = 0
+
+            self.batches += 1
+            self.samples += len(batch)
+            for index, future in enumerate(futures):
+                future.set_result(output[index:index + 1])
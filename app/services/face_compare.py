@@ -1,9 +1,19 @@
 import os
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+import cv2
+import numpy as np
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
 import torchvision.transforms as transforms
 from PIL import Image, ImageOps
+from settings import Config
+from services.face_batcher import InferenceBatcher
+from services import face_model
+from utils import metrics
 
 # Definir la red siamesa
 class SiameseNetwork(nn.Module):
@@ -28,7 +38,7 @@ class SiameseNetwork(nn.Module):
 
     def forward_once(self, x):
         output = self.cnn(x)
-        output = output.view(output.size(0), -1)
+        output = output.reshape(output.size(0), -1)  # reshape: la salida puede venir en channels_last
         output = self.fc(output)
         return F.normalize(output, p=2, dim=1)
 
@@ -50,13 +60,146 @@ def compare_faces(img1_path, img2_path, model, transform, device, should_invert=
 
     return F.pairwise_distance(embedding1, embedding2).item()
 
-# Configuraciones y carga de modelo
+# Convertir una cara BGR de OpenCV directamente a tensor (sin PIL ni JPEG)
+def face_to_tensor(face, device, should_invert=True, size=(100, 100)):
+    gris = cv2.cvtColor(face, cv2.COLOR_BGR2GRAY)
+    if should_invert:
+        gris = 255 - gris
+
+    # INTER_AREA al reducir se aproxima al Resize con antialias de torchvision
+    interpolacion = cv2.INTER_AREA if gris.shape[0] > size[1] else cv2.INTER_LINEAR
+    gris = cv2.resize(gris, size, interpolation=interpolacion)
+
+    tensor = torch.from_numpy(gris).float().div_(255.0).sub_(0.5).div_(0.5)
+    return tensor.unsqueeze(0).unsqueeze(0).to(device)
+
+def _face_key(face, should_invert):
+    digest = hashlib.sha1(np.ascontiguousarray(face).data)
+    digest.update(f'{face.shape}{face.dtype}{should_invert}'.encode('utf-8'))
+    return digest.hexdigest()
+
+class EmbeddingCache:
+    """
+    Bounded LRU of face embeddings keyed by crop content hash.
+    Values are futures, so concurrent requests for the same crop share one forward pass.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def reserve(self, key):
+        """
+        Return (future, owner); the owner is responsible for resolving a freshly created future.
+        """
+        with self._lock:
+            future = self._entries.get(key)
+            if future is not None:
+                self._entries.move_to_end(key)
+                return future, False
+
+            future = Future()
+            self._entries[key] = future
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return future, True
+
+    def discard(self, key, future):
+        with self._lock:
+            if self._entries.get(key) is future:
+                del self._entries[key]
+
+def _resolve(cache_future, key):
+    # Copiar el resultado del lote al futuro de la caché (y no cachear errores)
+    def callback(batch_future):
+        error = batch_future.exception()
+        if error is not None:
+            cache_future.set_exception(error)
+            embedding_cache.discard(key, cache_future)
+        else:
+            cache_future.set_result(batch_future.result())
+    return callback
+
+def submit_faces(faces, should_invert=True):
+    """
+    Return one embedding future per face. Crops not yet in the cache are sent together to the
+    micro-batcher, so both faces of a request (and concurrent requests) share a forward pass.
+    """
+    futures, pending = [], []
+    for face in faces:
+        key = _face_key(face, should_invert)
+        future, owner = embedding_cache.reserve(key)
+        futures.append(future)
+        if owner:
+            pending.append((key, future, face_to_tensor(face, device, should_invert)))
+
+    if pending:
+        batch_futures = get_batcher().submit_many([tensor for _, _, tensor in pending])
+        for (key, future, _), batch_future in zip(pending, batch_futures):
+            batch_future.add_done_callback(_resolve(future, key))
+
+    return futures
+
+def embed_faces(faces, should_invert=True):
+    """
+    Return the (1, 4096) embeddings of several face crops, computed once per crop content.
+    """
+    return [future.result() for future in submit_faces(faces, should_invert)]
+
+def embed_face(face, should_invert=True):
+    return embed_faces([face], should_invert)[0]
+
+def prefetch_embeddings(*faces):
+    """
+    Queue the embeddings of freshly cropped faces without waiting, so validation finds them cached.
+    """
+    submit_faces(faces)
+
+# Función para comparar caras ya decodificadas (arrays BGR de OpenCV), sin pasar por disco
+def compare_face_arrays(face1, face2, should_invert=True):
+    embedding1, embedding2 = embed_faces([face1, face2], should_invert)
+    return F.pairwise_distance(embedding1, embedding2).item()
+
+# Configuraciones; el modelo se carga al primer uso (o en el calentamiento de services.lifecycle)
 model_path = os.path.join(os.path.dirname(__file__), '../models/siamese_model_final.pth')
 model_path = os.path.abspath(model_path)
 device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
-model = SiameseNetwork().to(device)
-model.load_state_dict(torch.load(model_path, map_location=device))
-model.eval()
+_model = None
+_batcher = None
+_model_lock = threading.Lock()
+
+def get_model():
+    """
+    Return the fp32 SiameseNetwork, loading its weights on first use.
+    """
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                network = SiameseNetwork().to(device)
+                network.load_state_dict(torch.load(model_path, map_location=device))
+                network.eval()
+                _model = network
+    return _model
+
+def get_batcher():
+    """
+    Return the micro-batcher over the configured embedding model, building it on first use.
+    """
+    global _batcher
+    if _batcher is None:
+        network = get_model()
+        with _model_lock:
+            if _batcher is None:
+                # Modelo de embeddings: artefacto exportado o variante optimizada (fp32, int8, torchscript) del modelo base
+                if Config.FACE_MODEL_ARTIFACT:
+                    embedding_model = face_model.load_artifact(Config.FACE_MODEL_ARTIFACT, device)
+                else:
+                    embedding_model = face_model.optimize(network, Config.FACE_MODEL_VARIANT, Config.FACE_MODEL_CHANNELS_LAST, device)
+                _batcher = InferenceBatcher(embedding_model, Config.FACE_BATCH_MAX_SIZE, Config.FACE_BATCH_MAX_WAIT_MS)
+                metrics.track_queue('face_batcher', _batcher.stats)
+    return _batcher
 
 # Transformaciones de imagen
 transform = transforms.Compose([
@@ -65,7 +208,10 @@ transform = transforms.Compose([
     transforms.Normalize((0.5,), (0.5,))
 ])
 
-__all__ = ['model', 'device', 'transform', 'compare_faces']
+# Caché de embeddings por contenido de la cara y micro-lotes entre peticiones concurrentes
+embedding_cache = EmbeddingCache(Config.FACE_EMBEDDING_CACHE_SIZE)
+
+__all__ = ['get_model', 'get_batcher', 'device', 'transform', 'compare_faces', 'compare_face_arrays', 'embed_face', 'prefetch_embeddings']
 # Rutas de las imágenes a comparar
 # ruta_img1 = "/Users/matiasgalli/Documents/BACKWENO/static/face1_image_49a31c9db9f493d0b85b126a5187c659.jpg"
 # ruta_img2 = "/Users/matiasgalli/Documents/BACKWENO/static/face2_image_284ee91d3a62f3f7f619801be4ca6932.jpg"
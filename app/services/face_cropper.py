@@ -1,10 +1,7 @@
-import cv2
 import numpy as np
-import os
-import time
-import hashlib
+from utils import storage
 
-def crop_faces(image):
+def crop_faces(image, save=True):
     # Definir las coordenadas de recorte para las dos fotos
     height, width = image.shape[:2]
 
@@ -22,22 +19,14 @@ def crop_faces(image):
     face2 = image[face2_coords[1]:face2_coords[1] + face2_coords[3], 
                    face2_coords[0]:face2_coords[0] + face2_coords[2]]
 
-    # Guardar las imágenes de las caras en la carpeta temporal
-    face1_path = save_faces_temp(face1, "face1")
-    face2_path = save_faces_temp(face2, "face2")
+    # Guardar las imágenes de las caras en la carpeta temporal (solo si se piden rutas)
+    face1_path = save_faces_temp(face1, "face1") if save else None
+    face2_path = save_faces_temp(face2, "face2") if save else None
 
     return face1, face2, face1_path, face2_path
 
 def save_faces_temp(image, prefix, folder='./static'):
     """
-    Save a face image temporarily in the specified folder with a unique name based on a hash.
+    Save a face image temporarily in the specified folder, named and sharded by its content hash.
     """
-    if not os.path.exists(folder):
-        os.makedirs(folder)
-
-    timestamp = str(time.time()).encode('utf-8')
-    file_hash = hashlib.md5(timestamp).hexdigest()
-    temp_image_path = os.path.join(folder, f'{prefix}_image_{file_hash}.jpg')
-
-    cv2.imwrite(temp_image_path, image)
-    return temp_image_path
+    return storage.get_store(folder).save_image(image, f'{prefix}_image')
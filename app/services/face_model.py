@@ -0,0 +1,67 @@
+import copy
+import torch
+import torch.nn as nn
+
+# Variantes del modelo de embeddings seleccionables por configuración
+VARIANTS = ('fp32', 'int8', 'torchscript', 'int8_torchscript')
+
+
+class EmbeddingModule(nn.Module):
+    """
+    Exposes SiameseNetwork.forward_once as forward, so the embedding path can be traced and frozen.
+    """
+
+    def __init__(self, network, channels_last=False):
+        super(EmbeddingModule, self).__init__()
+        self.network = network
+        self.channels_last = channels_last
+
+    def forward(self, x):
+        if self.channels_last:
+            x = x.contiguous(memory_format=torch.channels_last)
+        return self.network.forward_once(x)
+
+
+def optimize(network, variant='fp32', channels_last=False, device=torch.device('cpu'), input_size=(100, 100)):
+    """
+    Build the embedding module for a variant: dynamic int8 quantization of the Linear head,
+    a frozen TorchScript graph, or both. channels_last switches the conv layers' memory layout.
+    """
+    if variant not in VARIANTS:
+        raise ValueError(f"Unknown face model variant '{variant}'. Available: {', '.join(VARIANTS)}")
+
+    # Copiar solo cuando se modifica el diseño en memoria, para no tocar el modelo fp32 original
+    if channels_last:
+        network = copy.deepcopy(network).to(memory_format=torch.channels_last)
+    network.eval()
+
+    if variant.startswith('int8'):
+        if device.type != 'cpu':
+            raise ValueError("Dynamic int8 quantization is only supported on CPU")
+        network = torch.ao.quantization.quantize_dynamic(network, {nn.Linear}, dtype=torch.qint8)
+
+    module = EmbeddingModule(network, channels_last).eval()
+
+    if variant.endswith('torchscript'):
+        example = torch.zeros(1, 1, *input_size, device=device)
+        with torch.no_grad():
+            traced = torch.jit.trace(module, example)
+        module = torch.jit.freeze(traced)
+
+    return module
+
+
+def export(module, path):
+    """
+    Save a TorchScript embedding module as a standalone artifact.
+    """
+    if not isinstance(module, torch.jit.ScriptModule):
+        raise ValueError("Only TorchScript variants can be exported")
+    torch.jit.save(module, path)
+
+
+def load_artifact(path, device):
+    """
+    Load a previously exported TorchScript embedding module.
+    """
+    return torch.jit.load(path, map_location=device).eval()
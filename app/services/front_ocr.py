@@ -1,15 +1,11 @@
 import cv2
-import pytesseract
-import threading
+import numpy as np
 import re
-import os
-
-# Configuración de la ruta de Tesseract
-pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
-
-# Crear una carpeta temporal para guardar imágenes
-if not os.path.exists('tmp_segments'):
-    os.makedirs('tmp_segments')
+import time
+from services import ocr_engine, ocr_executor
+from settings import Config
+from utils import debug_dump, metrics
+from utils.logger import logger
 
 # Segmentos definidos con ajustes en las coordenadas
 segmentos = {
@@ -25,6 +21,17 @@ segmentos = {
     "numero_identificador": (10, 450, 275, 510)
 }
 
+# Modo mosaico: separación vertical y margen (px) entre campos, y modo de segmentación de Tesseract
+MOSAICO_SEPARADOR = 40
+MOSAICO_MARGEN = 20
+MOSAICO_PSM = 6
+
+# Campos que se reconocen con otro modo de segmentación (el resto usa --psm 6). En modo mosaico
+# van aparte, con su propio psm, para leerse igual que en el modo por campo
+CAMPOS_PSM = {
+    "numero_documento": 8  # Una sola palabra
+}
+
 def normalizar_fecha(valor):
     """
     Normaliza las fechas en el formato DD MMM YYYY.
@@ -106,51 +113,160 @@ def preprocesar_segmento(segmento_imagen, binary_number= 55):
     umbral = cv2.adaptiveThreshold(gris, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, binary_number, 25)
     return umbral
 
-def procesar_segmento(image, segmento, campo, resultado_ocr):
+def preprocesar_campo(image, segmento, campo):
     """
-    Procesa un segmento de la imagen aplicando OCR y retorna el texto detectado.
+    Recorta un campo de la imagen alineada y aplica su preprocesamiento específico.
     """
-    try:
-        x1, y1, x2, y2 = segmento
-        segmento_imagen = image[y1:y2, x1:x2]
+    x1, y1, x2, y2 = segmento
+    segmento_imagen = image[y1:y2, x1:x2]
 
-        # Aplicar preprocesamiento individual al segmento
-        segmento_preprocesado = None
-        binary_number = 55
-        if campo == "numero_documento":
-            binary_number = 95
-            segmento_preprocesado = preprocesar_segmento(segmento_imagen, binary_number)
-        else:
-            segmento_preprocesado = preprocesar_segmento(segmento_imagen, binary_number)
+    # Aplicar preprocesamiento individual al segmento
+    binary_number = 55
+    if campo == "numero_documento":
+        binary_number = 95
+    return preprocesar_segmento(segmento_imagen, binary_number)
 
-        # Guardar segmento preprocesado (opcional)
-        binarized_path = f'tmp_segments/{campo}.jpg'
-        cv2.imwrite(binarized_path, segmento_preprocesado)
+def guardar_resultado(campo, texto_segmento, resultado_ocr):
+    """
+    Limpia el texto de un campo y lo almacena en el resultado con el formato esperado.
+    """
+    # Limpiar los datos obtenidos
+    texto_limpio = limpiar_datos(campo, texto_segmento)
 
-        # Configuración específica de Tesseract
-        config = "--psm 6"
-        if campo == "numero_documento":
-            config = "--psm 8"  # Usar configuración enfocada en una sola línea de texto
-
-        texto_segmento = pytesseract.image_to_string(segmento_preprocesado, config=config, lang='spa').strip()
-        # Limpiar los datos obtenidos
-        texto_limpio = limpiar_datos(campo, texto_segmento)
-
-        # Almacenar los resultados de OCR
-        if campo == "numero_identificador":
-            if isinstance(texto_limpio, tuple):
-                numero, digito_verificador = texto_limpio
-                resultado_ocr["RUN"] = numero
-                resultado_ocr["digito_verificador"] = digito_verificador
-            else:
-                resultado_ocr[campo] = texto_limpio
+    # Almacenar los resultados de OCR
+    if campo == "numero_identificador":
+        if isinstance(texto_limpio, tuple):
+            numero, digito_verificador = texto_limpio
+            resultado_ocr["RUN"] = numero
+            resultado_ocr["digito_verificador"] = digito_verificador
         else:
             resultado_ocr[campo] = texto_limpio
+    else:
+        resultado_ocr[campo] = texto_limpio
+
+def procesar_segmento(image, segmento, campo, directorio_debug=None):
+    """
+    Prepara un segmento de la imagen para OCR y retorna el segmento preprocesado.
+    """
+    segmento_preprocesado = preprocesar_campo(image, segmento, campo)
+
+    # Guardar segmento preprocesado (solo si la petición fue muestreada para depuración)
+    debug_dump.dump(directorio_debug, campo, segmento_preprocesado)
+
+    return segmento_preprocesado
+
+def reconocer_campo(segmento_preprocesado, campo):
+    """
+    Aplica OCR a un segmento ya preprocesado y retorna los valores limpios del campo.
+    Se ejecuta en el executor compartido de OCR.
+    """
+    resultado_ocr = {}
+    try:
+        # Configuración específica de Tesseract
+        psm = CAMPOS_PSM.get(campo, 6)
+
+        inicio = time.perf_counter()
+        texto_segmento = ocr_engine.image_to_string(segmento_preprocesado, lang='spa', psm=psm).strip()
+        metrics.observe_field(campo, time.perf_counter() - inicio)
+        guardar_resultado(campo, texto_segmento, resultado_ocr)
 
     except Exception as e:
-        print(f"Error al procesar el campo {campo}: {e}")
+        logger.warning(f"Error al procesar el campo {campo}: {e}", extra={"field": campo})
         resultado_ocr[campo] = f"Error en {campo}"
 
+    return resultado_ocr
+
+def construir_mosaico(image, campos=None):
+    """
+    Apila verticalmente los campos preprocesados (todos si no se indican), separados por franjas blancas.
+    Retorna el mosaico y la franja vertical (y_inicio, y_fin) que ocupa cada campo.
+    """
+    campos = campos or list(segmentos)
+    recortes = [(campo, preprocesar_campo(image, segmentos[campo], campo)) for campo in campos]
+    ancho = max(recorte.shape[1] for _, recorte in recortes) + 2 * MOSAICO_MARGEN
+
+    bloques = [np.full((MOSAICO_SEPARADOR, ancho), 255, np.uint8)]
+    franjas = {}
+    y = MOSAICO_SEPARADOR
+    for campo, recorte in recortes:
+        alto = recorte.shape[0]
+        bloque = np.full((alto, ancho), 255, np.uint8)
+        bloque[:, MOSAICO_MARGEN:MOSAICO_MARGEN + recorte.shape[1]] = recorte
+        bloques.append(bloque)
+        bloques.append(np.full((MOSAICO_SEPARADOR, ancho), 255, np.uint8))
+        franjas[campo] = (y, y + alto)
+        y += alto + MOSAICO_SEPARADOR
+
+    return np.vstack(bloques), franjas
+
+def asignar_palabras(palabras, franjas):
+    """
+    Asigna cada palabra al campo cuya franja contiene (o está más cerca de) su centro vertical
+    y reconstruye el texto de cada campo por líneas, de izquierda a derecha.
+    """
+    por_campo = {campo: [] for campo in franjas}
+    for palabra in palabras:
+        centro = palabra["top"] + palabra["height"] / 2
+        campo = min(franjas, key=lambda c: 0 if franjas[c][0] <= centro < franjas[c][1]
+                    else min(abs(centro - franjas[c][0]), abs(centro - franjas[c][1])))
+        por_campo[campo].append(palabra)
+
+    textos = {}
+    for campo, palabras_campo in por_campo.items():
+        lineas = []
+        for palabra in sorted(palabras_campo, key=lambda p: p["top"]):
+            centro = palabra["top"] + palabra["height"] / 2
+            if lineas and abs(centro - lineas[-1]["centro"]) < palabra["height"] / 2:
+                lineas[-1]["palabras"].append(palabra)
+            else:
+                lineas.append({"centro": centro, "palabras": [palabra]})
+        textos[campo] = "\n".join(
+            " ".join(p["text"] for p in sorted(linea["palabras"], key=lambda p: p["left"])) for linea in lineas
+        )
+    return textos
+
+def procesar_ocr_mosaico(image):
+    """
+    Reconoce los campos del frente con una sola llamada al motor sobre un mosaico de campos; los
+    campos con otro psm (CAMPOS_PSM) se reconocen aparte, en paralelo, como en el modo por campo.
+    """
+    campos_mosaico = [campo for campo in segmentos if CAMPOS_PSM.get(campo, MOSAICO_PSM) == MOSAICO_PSM]
+    campos_aparte = [campo for campo in segmentos if campo not in campos_mosaico]
+
+    mosaico, franjas = construir_mosaico(image, campos_mosaico)
+    debug_dump.dump(debug_dump.start_request(), 'mosaico', mosaico)
+    llamadas = [(ocr_engine.image_to_data, (mosaico, 'spa', MOSAICO_PSM))] + [
+        (reconocer_campo, (preprocesar_campo(image, segmentos[campo], campo), campo)) for campo in campos_aparte
+    ]
+    with metrics.timer('ocr_mosaic'):
+        futuro_mosaico, *futuros_aparte = ocr_executor.submit_all(llamadas)
+        palabras = futuro_mosaico.result()
+    textos = asignar_palabras(palabras, franjas)
+
+    resultado_ocr = {}
+    for futuro in futuros_aparte:
+        resultado_ocr.update(futuro.result())
+    for campo in campos_mosaico:
+        try:
+            guardar_resultado(campo, textos.get(campo, ""), resultado_ocr)
+        except Exception as e:
+            logger.warning(f"Error al procesar el campo {campo}: {e}", extra={"field": campo})
+            resultado_ocr[campo] = f"Error en {campo}"
+    registrar_fallos(resultado_ocr)
+    return resultado_ocr
+
+def registrar_fallos(resultado_ocr):
+    """
+    Cuenta en las métricas los campos que quedaron vacíos o con error.
+    """
+    for campo in segmentos:
+        if campo == "numero_identificador" and "RUN" in resultado_ocr:
+            valor = resultado_ocr["RUN"]
+        else:
+            valor = resultado_ocr.get(campo)
+        if not valor or str(valor).startswith("Error en"):
+            metrics.observe_field(campo, failed=True)
+
 def limpiar_datos(campo, valor):
     """
     Limpia los datos eliminando caracteres no deseados y ajusta el formato específico para cada campo.
@@ -193,22 +309,30 @@ def limpiar_datos(campo, valor):
 
     return valor
 
-def procesar_ocr_completo(image):
+def procesar_ocr_completo(image, mode=None):
     """
     Función principal que procesa la imagen, la segmenta y aplica OCR a cada segmento.
+    El modo ('per_field' o 'mosaic') se toma de FRONT_OCR_MODE si no se indica.
     """
     # Detectar problemas de sobreexposición
     problema_detectado, mensaje = detectar_problemas_flash_mrz(image, segmentos)
     if problema_detectado:
-        print(mensaje)
+        logger.info(mensaje)
         return {"error": mensaje}
 
+    if (mode or Config.FRONT_OCR_MODE) == 'mosaic':
+        return procesar_ocr_mosaico(image)
+
+    # Encolar un OCR por campo en el executor compartido (acotado y equitativo entre peticiones)
+    directorio_debug = debug_dump.start_request()
+    llamadas = [
+        (reconocer_campo, (procesar_segmento(image, coordenadas, campo, directorio_debug), campo))
+        for campo, coordenadas in segmentos.items()
+    ]
+    futuros = ocr_executor.submit_all(llamadas)
+
     resultado_ocr = {}
-    hilos = []
-    for campo, coordenadas in segmentos.items():
-        hilo = threading.Thread(target=procesar_segmento, args=(image, coordenadas, campo, resultado_ocr))
-        hilos.append(hilo)
-        hilo.start()
-    for hilo in hilos:
-        hilo.join()
+    for futuro in futuros:
+        resultado_ocr.update(futuro.result())
+    registrar_fallos(resultado_ocr)
     return resultado_ocr
\ No newline at end of file
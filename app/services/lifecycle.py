@@ -0,0 +1,190 @@
+import threading
+import time
+import numpy as np
+from settings import Config
+from utils import memory, path_utils
+from utils.logger import logger
+
+# Etapas de arranque, en orden; el servicio está listo cuando todas terminaron bien
+STAGES = ('references', 'ocr_engines', 'face_model', 'warmup')
+
+_status = {stage: {"state": "pending"} for stage in STAGES}
+_status_lock = threading.Lock()
+_thread = None
+_running = False
+_started_at = time.time()
+
+
+def _set(stage, **fields):
+    with _status_lock:
+        _status[stage] = fields
+
+
+def load_references():
+    """
+    Load the reference images and the feature packs of every backend the service may use.
+    """
+    path_utils.get_front_reference_images()
+    path_utils.get_back_reference_images()
+    for backend in {Config.ALIGN_BACKEND, Config.ALIGN_FAST_BACKEND, 'sift'}:
+        path_utils.get_front_reference_features(backend)
+        path_utils.get_back_reference_features(backend)
+
+
+def load_ocr_engines():
+    from services import ocr_engine
+    ocr_engine.warm_up()
+
+
+def load_face_model():
+    from services import face_compare
+    face_compare.get_batcher()
+
+
+def warm_up_pipelines():
+    """
+    Run one synthetic request through each pipeline, using the first reference of each side as
+    the upload, so the first real request does not pay for cold caches and allocators.
+    """
+    from services import back_normalize, back_ocr, detect_qr, face_compare, face_cropper, front_ocr
+
+    front = back_normalize.align_card(path_utils.get_front_reference_images()[0], 'front')
+    if front is None:
+        raise RuntimeError("Front reference did not align against itself")
+    front_ocr.procesar_ocr_completo(front)
+
+    # Las caras van directo al lote para no dejar entradas sintéticas en la caché de embeddings
+    face1, face2, _, _ = face_cropper.crop_faces(front, save=False)
+    tensors = [face_compare.face_to_tensor(np.ascontiguousarray(face), face_compare.device) for face in (face1, face2)]
+    for future in face_compare.get_batcher().submit_many(tensors):
+        future.result()
+
+    back = back_normalize.align_card(path_utils.get_back_reference_images()[0], 'back')
+    if back is None:
+        raise RuntimeError("Back reference did not align against itself")
+    back_ocr.procesar_ocr_reverso(back)
+    detect_qr.detect_qr(back)
+
+
+def _run_stage(stage, step):
+    start = time.perf_counter()
+    _set(stage, state="loading")
+    try:
+        step()
+    except Exception as e:
+        logger.exception(f"Error en el arranque ({stage}): {e}", extra={"stage": stage})
+        _set(stage, state="failed", error=str(e), seconds=round(time.perf_counter() - start, 3))
+    else:
+        _set(stage, state="ready", seconds=round(time.perf_counter() - start, 3))
+
+
+def _failed_stages():
+    with _status_lock:
+        return [stage for stage in STAGES if _status[stage]["state"] == "failed"]
+
+
+def _run():
+    steps = {
+        'references': load_references,
+        'ocr_engines': load_ocr_engines,
+        'face_model': load_face_model,
+        'warmup': warm_up_pipelines
+    }
+    for stage in STAGES:
+        if stage == 'warmup' and not Config.WARMUP_SYNTHETIC_REQUESTS:
+            _set(stage, state="skipped")
+            continue
+        # Al relanzar el arranque (o tras preload en el maestro) no repetir lo que ya está listo
+        with _status_lock:
+            if _status[stage]["state"] == "ready":
+                continue
+        _run_stage(stage, steps[stage])
+
+    # Errores transitorios (carrera al iniciar motores, primer OCR de calentamiento): reintentar
+    # solo las etapas fallidas, en orden, con espera exponencial
+    for attempt in range(Config.STARTUP_RETRIES):
+        failed = _failed_stages()
+        if not failed:
+            return
+        delay = min(Config.STARTUP_RETRY_BACKOFF * 2 ** attempt, Config.STARTUP_RETRY_MAX_BACKOFF)
+        logger.warning(f"Reintentando etapas de arranque en {delay}s", extra={"stages": failed, "attempt": attempt + 1})
+        time.sleep(delay)
+        for stage in failed:
+            _run_stage(stage, steps[stage])
+
+
+def _run_once():
+    global _running
+    try:
+        _run()
+    finally:
+        with _status_lock:
+            _running = False
+
+
+def retry():
+    """
+    Run the startup again if a previous run finished with failed stages (called by /readyz).
+    """
+    if _thread is not None:
+        start()
+
+
+def preload():
+    """
+    Load the read-only resources (reference images, feature packs and model weights) in the
+    current process without starting any thread, so that workers forked afterwards share their
+    memory pages. Engines, batchers and the synthetic warmup are left to start() in each worker.
+    """
+    from services import face_compare
+
+    _run_stage('references', load_references)
+    face_compare.get_model()
+
+
+def start(background=True):
+    """
+    Load the heavy resources and warm the pipelines up, by default in a background thread so
+    the server can answer /healthz while it is still warming up. Failed stages are retried with
+    backoff (STARTUP_RETRIES); once those are exhausted, a new call runs the startup again.
+    Otherwise only the first call has effect.
+    """
+    global _thread, _running
+    with _status_lock:
+        if _running or (_thread is not None and not any(entry["state"] == "failed" for entry in _status.values())):
+            return
+        _running = True
+        _thread = threading.Thread(target=_run_once, name='lifecycle-warmup', daemon=True)
+
+    if background:
+        _thread.start()
+    else:
+        _thread.run()
+
+
+def wait(timeout=None):
+    """
+    Block until the startup stages finished (or the timeout expires). Returns whether it is ready.
+    """
+    if _thread is not None and _thread.is_alive():
+        _thread.join(timeout)
+    return is_ready()
+
+
+def is_ready():
+    with _status_lock:
+        return all(entry["state"] in ("ready", "skipped") for entry in _status.values())
+
+
+def status():
+    """
+    Return the state of every startup stage, whether the service is ready and its uptime.
+    """
+    with _status_lock:
+        stages = {stage: dict(entry) for stage, entry in _status.items()}
+    return {
+        "ready": all(entry["state"] in ("ready", "skipped") for entry in stages.values()),
+        "uptime": round(time.time() - _started_at, 1),
+        "memory": memory.process_memory(),
+        "stages": stages
+    }
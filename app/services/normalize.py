@@ -1,31 +1,30 @@
 import cv2
 import numpy as np
+from utils.keypoint_backends import get_backend, ratio_test
 
-# Función para alinear la imagen basada en puntos SIFT
-def align_carnet(image, reference):
+# Función para alinear la imagen basada en puntos clave (SIFT por defecto, u ORB/AKAZE)
+def align_carnet(image, reference, backend='sift', nfeatures=0):
     # Convertir las imágenes a escala de grises
     gray_original = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
     gray_reference = cv2.cvtColor(reference, cv2.COLOR_BGR2GRAY)
 
-    # Crear objeto SIFT
-    sift = cv2.SIFT_create()
+    # Crear el detector del backend elegido (ORB necesita un límite explícito de puntos)
+    keypoint_backend = get_backend(backend)
+    if nfeatures <= 0:
+        nfeatures = 0 if backend == 'sift' else 5000
 
     # Detectar puntos clave y descriptores
-    keypoints_original, descriptors_original = sift.detectAndCompute(gray_original, None)
-    keypoints_reference, descriptors_reference = sift.detectAndCompute(gray_reference, None)
-
-    # Usar FLANN para encontrar coincidencias
-    FLANN_INDEX_KDTREE = 1
-    index_params = dict(algorithm=FLANN_INDEX_KDTREE, trees=5)
-    search_params = dict(checks=50)
-    flann = cv2.FlannBasedMatcher(index_params, search_params)
+    keypoints_original, descriptors_original = keypoint_backend.detect_and_compute(gray_original, nfeatures)
+    keypoints_reference, descriptors_reference = keypoint_backend.detect_and_compute(gray_reference, nfeatures)
+    if descriptors_original is None or descriptors_reference is None:
+        return None
+
+    # Usar FLANN (KD-tree para SIFT, LSH para descriptores binarios) para encontrar coincidencias
+    flann = keypoint_backend.create_matcher()
     matches = flann.knnMatch(descriptors_original, descriptors_reference, k=2)
 
     # Almacenar las buenas coincidencias según el ratio de Lowe
-    good_matches = []
-    for m, n in matches:
-        if m.distance < 0.7 * n.distance:
-            good_matches.append(m)
+    good_matches = ratio_test(matches, 0.7)
 
     # Verificar que se encontraron suficientes coincidencias
     if len(good_matches) > 10:
@@ -35,6 +34,8 @@ def align_carnet(image, reference):
 
         # Calcular la transformación de perspectiva (Homografía)
         M, mask = cv2.findHomography(src_pts, dst_pts, cv2.RANSAC, 5.0)
+        if M is None:
+            return None
 
         # Aplicar la transformación de perspectiva a la imagen original
         h, w = reference.shape[:2]
@@ -42,4 +43,4 @@ def align_carnet(image, reference):
 
         return transformed_image
     else:
-        return None
\ No newline at end of file
+        return None
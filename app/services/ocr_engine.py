@@ -0,0 +1,206 @@
+import queue
+import threading
+from contextlib import contextmanager
+import numpy as np
+import pytesseract
+from settings import Config
+
+# libtesseract vía tesserocr es opcional: sin ella se vuelve a pytesseract (un proceso por llamada)
+try:
+    import tesserocr
+except ImportError:
+    tesserocr = None
+
+pytesseract.pytesseract.tesseract_cmd = Config.TESSERACT_CMD
+
+# Motores usados por el servicio: (idioma, OEM)
+DEFAULT_ENGINES = (('spa', 3), ('mrz', 1))
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class EngineUnavailable(Exception):
+    """
+    Raised when no Tesseract instance of a pool could be leased within OCR_ENGINE_LEASE_TIMEOUT.
+    """
+
+
+class EnginePool:
+    """
+    Long-lived, pre-initialised Tesseract instances for one language/OEM pair, leased one request at a time.
+    """
+
+    def __init__(self, lang, oem, size):
+        self.lang = lang
+        self.oem = oem
+        self.size = size
+        self.created = 0
+        self.idle = queue.LifoQueue()
+        self.lock = threading.Lock()
+
+    def _create(self):
+        kwargs = dict(lang=self.lang, oem=self.oem, init=True)
+        if Config.TESSDATA_PATH:
+            kwargs['path'] = Config.TESSDATA_PATH
+        return tesserocr.PyTessBaseAPI(**kwargs)
+
+    def _reserve(self):
+        with self.lock:
+            if self.created >= self.size:
+                return False
+            self.created += 1
+            return True
+
+    def _create_reserved(self):
+        # Si la inicialización falla (tessdata ausente, ruta errónea) se devuelve la plaza al pool
+        try:
+            return self._create()
+        except Exception:
+            with self.lock:
+                self.created -= 1
+            raise
+
+    def preload(self):
+        """
+        Initialise every instance of the pool up front so no request pays for model loading.
+        """
+        while self._reserve():
+            self.idle.put(self._create_reserved())
+
+    @contextmanager
+    def lease(self):
+        api = None
+        try:
+            api = self.idle.get_nowait()
+        except queue.Empty:
+            if self._reserve():
+                api = self._create_reserved()
+            else:
+                try:
+                    api = self.idle.get(timeout=Config.OCR_ENGINE_LEASE_TIMEOUT)
+                except queue.Empty:
+                    raise EngineUnavailable(
+                        f"No Tesseract engine for {self.lang} within {Config.OCR_ENGINE_LEASE_TIMEOUT}s") from None
+
+        try:
+            yield api
+        finally:
+            api.Clear()
+            self.idle.put(api)
+
+
+def get_pool(lang, oem):
+    key = (lang, oem)
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                pool = EnginePool(lang, oem, Config.OCR_ENGINES_PER_LANG)
+                _pools[key] = pool
+    return pool
+
+
+def _set_image(api, image):
+    image = np.ascontiguousarray(image)
+    height, width = image.shape[:2]
+    bytes_per_pixel = 1 if image.ndim == 2 else image.shape[2]
+    api.SetImageBytes(image.tobytes(), width, height, bytes_per_pixel, width * bytes_per_pixel)
+
+
+def _apply_variables(api, variables):
+    for name, value in variables.items():
+        api.SetVariable(name, value)
+
+
+def _reset_variables(api, variables):
+    for name in variables:
+        api.SetVariable(name, '')
+
+
+def _cli_config(psm, oem, variables):
+    config = f"--psm {psm}"
+    if oem is not None and oem != 3:
+        config += f" --oem {oem}"
+    for name, value in variables.items():
+        config += f" -c {name}={value}"
+    return config
+
+
+def image_to_string(image, lang, psm, oem=3, variables=None):
+    """
+    OCR a numpy image (grayscale or BGR) with a warm engine; no temp files or subprocesses.
+    """
+    variables = variables or {}
+    if tesserocr is None:
+        return pytesseract.image_to_string(image, config=_cli_config(psm, oem, variables), lang=lang)
+
+    with get_pool(lang, oem).lease() as api:
+        api.SetPageSegMode(psm)
+        _apply_variables(api, variables)
+        try:
+            _set_image(api, image)
+            return api.GetUTF8Text()
+        finally:
+            _reset_variables(api, variables)
+
+
+def image_to_data(image, lang, psm, oem=3, variables=None):
+    """
+    OCR a numpy image and return its words as dicts with text, confidence and bounding box.
+    """
+    variables = variables or {}
+    if tesserocr is None:
+        data = pytesseract.image_to_data(image, config=_cli_config(psm, oem, variables), lang=lang,
+                                         output_type=pytesseract.Output.DICT)
+        return [
+            {
+                "text": data['text'][i].strip(),
+                "conf": float(data['conf'][i]),
+                "left": data['left'][i],
+                "top": data['top'][i],
+                "width": data['width'][i],
+                "height": data['height'][i]
+            }
+            for i in range(len(data['text']))
+            if data['level'][i] == 5 and data['text'][i].strip()
+        ]
+
+    words = []
+    with get_pool(lang, oem).lease() as api:
+        api.SetPageSegMode(psm)
+        _apply_variables(api, variables)
+        try:
+            _set_image(api, image)
+            api.Recognize()
+            iterator = api.GetIterator()
+            level = tesserocr.RIL.WORD
+            if iterator is not None:
+                for word in tesserocr.iterate_level(iterator, level):
+                    text = word.GetUTF8Text(level)
+                    bbox = word.BoundingBox(level)
+                    if not text or not text.strip() or bbox is None:
+                        continue
+                    x1, y1, x2, y2 = bbox
+                    words.append({
+                        "text": text.strip(),
+                        "conf": word.Confidence(level),
+                        "left": x1,
+                        "top": y1,
+                        "width": x2 - x1,
+                        "height": y2 - y1
+                    })
+        finally:
+            _reset_variables(api, variables)
+    return words
+
+
+def warm_up(engines=DEFAULT_ENGINES):
+    """
+    Pre-initialise the engine pools for the languages the service uses.
+    """
+    if tesserocr is None:
+        return
+    for lang, oem in engines:
+        get_pool(lang, oem).preload()
@@ -0,0 +1,70 @@
+import contextvars
+import functools
+import threading
+from contextlib import contextmanager
+from settings import Config
+from utils import metrics
+from utils.fair_executor import FairExecutor, ExecutorSaturated
+
+_executor = None
+_lock = threading.Lock()
+_local = threading.local()
+
+__all__ = ['get_executor', 'request_key', 'scheduling_key', 'submit', 'submit_all', 'ExecutorSaturated']
+
+
+def get_executor():
+    """
+    Return the process-wide OCR executor, created on first use.
+    """
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = FairExecutor(
+                    Config.OCR_EXECUTOR_WORKERS,
+                    Config.OCR_EXECUTOR_MAX_QUEUE,
+                    Config.OCR_EXECUTOR_MODE,
+                    name='ocr'
+                )
+                metrics.track_queue('ocr', _executor.stats)
+    return _executor
+
+
+def request_key():
+    """
+    Key used to schedule fairly between requests: each request is served by its own thread,
+    unless the thread is running under scheduling_key().
+    """
+    key = getattr(_local, 'key', None)
+    return key if key is not None else threading.get_ident()
+
+
+@contextmanager
+def scheduling_key(key):
+    """
+    Schedule the OCR work of this thread under a shared key, so that work spread over several
+    threads (e.g. a batch) gets a single turn in the round-robin instead of one per thread.
+    """
+    previous = getattr(_local, 'key', None)
+    _local.key = key
+    try:
+        yield
+    finally:
+        _local.key = previous
+
+
+def _bind_context(calls):
+    # Las tareas corren en el contexto de la petición: sus logs llevan el request ID y sus
+    # etapas llegan al perfil si se está perfilando (no aplica a procesos)
+    if get_executor().mode != 'thread':
+        return calls
+    return [(functools.partial(contextvars.copy_context().run, fn), args) for fn, args in calls]
+
+
+def submit(fn, *args):
+    return submit_all([(fn, args)])[0]
+
+
+def submit_all(calls):
+    return get_executor().submit_all(request_key(), _bind_context(calls))
@@ -0,0 +1,324 @@
+import contextvars
+import threading
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import numpy as np
+from services import face_cropper, face_compare, front_ocr, back_ocr, back_normalize, detect_qr, validate, ocr_executor, quality
+from settings import Config
+from utils import image_utils, artifact_store, metrics
+from utils.logger import logger
+
+# Contadores globales de validación (los hilos de Flask y de los pools los comparten)
+validation_success = 0
+validation_failure = 0
+_counters_lock = threading.Lock()
+
+# Hilos para procesar el reverso en paralelo al anverso en /api/verify: uno por petición
+# concurrente del proceso, si no los reversos esperan turno y la latencia deja de ser ~max(anverso, reverso)
+_side_executor = ThreadPoolExecutor(Config.VERIFY_WORKERS, thread_name_prefix='verify')
+
+# Pool compartido por todos los lotes de /api/batch
+_batch_executor = ThreadPoolExecutor(Config.BATCH_WORKERS, thread_name_prefix='batch')
+
+
+class AlignmentFailed(Exception):
+    """
+    Raised when an upload cannot be aligned against the references of its side.
+    """
+
+
+class IncompleteArtifacts(Exception):
+    """
+    Raised when /api/validate sends only one of img_1_id/img_2_id.
+    """
+
+
+class ArtifactNotFound(Exception):
+    """
+    Raised when /api/validate references artifact IDs that are unknown or already expired.
+    """
+
+    def __init__(self, missing):
+        super().__init__(f"Unknown or expired artifact IDs: {', '.join(missing)}")
+        self.missing = missing
+
+
+def process_front(image, mode=None, gate=True):
+    """
+    Align a front upload, OCR it and crop its faces. Returns (aligned image, OCR result, face1, face2).
+    gate=False skips the quality gate when the caller already ran it.
+    """
+    # Un ?mode= desconocido es un error del cliente: rechazarlo antes de gastar CPU
+    back_normalize.check_mode(mode)
+
+    # Descartar capturas borrosas, con reflejos o demasiado pequeñas antes de alinear
+    if gate:
+        quality.check(image, 'front')
+
+    # Alinear la imagen con las referencias (?mode=fast usa descriptores binarios con respaldo a SIFT)
+    normalized_image = back_normalize.align_card(image, 'front', mode)
+
+    if normalized_image is None:
+        raise AlignmentFailed("Alignment failed")
+
+    # Procesar OCR completo usando el servicio OCR
+    resultado_ocr = front_ocr.procesar_ocr_completo(normalized_image)
+
+    # Recortar las caras (en memoria)
+    face1, face2, _, _ = face_cropper.crop_faces(normalized_image, save=False)
+    return normalized_image, resultado_ocr, np.ascontiguousarray(face1), np.ascontiguousarray(face2)
+
+
+def process_back(image, mode=None, gate=True):
+    """
+    Align a back upload, OCR its MRZ and read its QR. Returns (aligned image, OCR result, QR value).
+    """
+    back_normalize.check_mode(mode)
+    if gate:
+        quality.check(image, 'back')
+    normalized_image = back_normalize.align_card(image, 'back', mode)
+
+    if normalized_image is None:
+        raise AlignmentFailed("Alignment failed")
+
+    # Procesar OCR en la imagen alineada
+    resultado_ocr = back_ocr.procesar_ocr_reverso(normalized_image)
+    qr_value = detect_qr.detect_qr(normalized_image)
+    return normalized_image, resultado_ocr, qr_value
+
+
+def run_front(image, mode=None):
+    """
+    Process a front upload and keep its images for /api/validate. Returns the /api/ocr/front response body.
+    """
+    normalized_image, resultado_ocr, face1, face2 = process_front(image, mode)
+
+    # Guardar la imagen y las caras temporalmente (solo para clientes que usan rutas)
+    temp_image_path = image_utils.save_image_temp(normalized_image) if Config.LEGACY_TEMP_FILES else None
+    face1_temp_path = face_cropper.save_faces_temp(face1, "face1") if Config.LEGACY_TEMP_FILES else None
+    face2_temp_path = face_cropper.save_faces_temp(face2, "face2") if Config.LEGACY_TEMP_FILES else None
+
+    # Calcular los embeddings en segundo plano para que /api/validate los encuentre en caché
+    if Config.FACE_EMBED_EAGER:
+        face_compare.prefetch_embeddings(face1, face2)
+
+    # Mantener las imágenes decodificadas en memoria para /api/validate
+    return {
+        "text": resultado_ocr,
+        "image_id": artifact_store.store.put(normalized_image),
+        "face1_id": artifact_store.store.put(face1),
+        "face2_id": artifact_store.store.put(face2),
+        "temp_image_path": temp_image_path,
+        "face1_temp_path": face1_temp_path,
+        "face2_temp_path": face2_temp_path
+    }
+
+
+def run_back(image, mode=None):
+    """
+    Process a back upload and keep its image for later requests. Returns the /api/ocr/back response body.
+    """
+    normalized_image, resultado_ocr, qr_value = process_back(image, mode)
+
+    # Guardar la imagen alineada temporalmente (solo para clientes que usan rutas)
+    temp_image_path = image_utils.save_image_temp(normalized_image) if Config.LEGACY_TEMP_FILES else None
+
+    return {
+        "qr": qr_value,
+        "text": resultado_ocr,
+        "image_id": artifact_store.store.put(normalized_image),
+        "temp_image_path": temp_image_path
+    }
+
+
+def run_validate(data):
+    """
+    Validate the front/back data and faces of a /api/validate request body.
+    """
+    try:
+        # Extraer los datos de la solicitud
+        front_info = data.get('front_data', {})
+        back_info = data.get('back_data', {})
+        ruta_img_1 = data.get('img_1_route')
+        ruta_img_2 = data.get('img_2_route')
+        qr_data = data.get('qr')
+
+        # Preferir las caras en memoria de /api/ocr/front; las rutas quedan para clientes antiguos
+        if data.get('img_1_id') or data.get('img_2_id'):
+            if not (data.get('img_1_id') and data.get('img_2_id')):
+                raise IncompleteArtifacts("Both img_1_id and img_2_id are required")
+            ruta_img_1 = artifact_store.store.get(data.get('img_1_id'))
+            ruta_img_2 = artifact_store.store.get(data.get('img_2_id'))
+    except IncompleteArtifacts:
+        raise
+    except Exception as e:
+        _record_error(e)
+        raise
+
+    # Un ID caducado no es una cara distinta: avisar al cliente para que repita /api/ocr/front
+    missing = [key for key, face in (('img_1_id', ruta_img_1), ('img_2_id', ruta_img_2))
+               if data.get(key) and face is None]
+    if missing:
+        raise ArtifactNotFound(missing)
+
+    return validate_card(front_info, back_info, ruta_img_1, ruta_img_2, qr_data)
+
+
+def validate_card(front_info, back_info, face1, face2, qr):
+    """
+    Run the validations on already extracted data (faces as arrays or file paths), keeping the totals.
+    """
+    global validation_success
+    try:
+        with metrics.timer('validation'):
+            validation_results = validate.validate_data(front_info, back_info, face1, face2, qr)
+    except Exception as e:
+        _record_error(e)
+        raise
+
+    # Detectar si hubo fallos
+    failed_checks = [key for key, value in validation_results.items() if not value]
+
+    if failed_checks:
+        _record_failure(failed_checks)
+    else:
+        # Incrementar el contador de éxitos y registrar los detalles
+        with _counters_lock:
+            validation_success += 1
+            success, failure = validation_success, validation_failure
+        metrics.count_validation('success')
+        logger.info(f"Validation successful. Total Success: {success}, Total Failures: {failure}")
+
+    return validation_results
+
+
+def _record_failure(failed_checks):
+    # Incrementar el contador de fallos y registrar los detalles
+    global validation_failure
+    with _counters_lock:
+        validation_failure += 1
+        success, failure = validation_success, validation_failure
+    metrics.count_validation('failure', failed_checks)
+    logger.warning(
+        f"Validation failed. Failures in: {failed_checks}. "
+        f"Total Success: {success}, Total Failures: {failure}"
+    )
+
+
+def _record_error(error):
+    global validation_failure
+    with _counters_lock:
+        validation_failure += 1
+    metrics.count_validation('error')
+    logger.error(f"An error occurred in validation: {str(error)}")
+
+
+def run_verify(front_image, back_image, mode=None):
+    """
+    Process both sides of a card concurrently and validate them in memory.
+    Returns the /api/verify response body.
+    """
+    back_normalize.check_mode(mode)
+
+    # Revisar la calidad de ambas caras antes de gastar CPU en cualquiera de ellas
+    quality.check(front_image, 'front')
+    quality.check(back_image, 'back')
+
+    # El reverso en otro hilo mientras este procesa el anverso: latencia ~ max(anverso, reverso).
+    # Corre en el contexto de la petición (request ID, perfil en curso)
+    back_future = _side_executor.submit(contextvars.copy_context().run, process_back, back_image, mode, False)
+    try:
+        _, front_text, face1, face2 = process_front(front_image, mode, False)
+    except AlignmentFailed:
+        back_future.cancel()
+        raise AlignmentFailed("Front alignment failed")
+    except Exception:
+        back_future.cancel()
+        raise
+
+    try:
+        _, back_text, qr_value = back_future.result()
+    except AlignmentFailed:
+        raise AlignmentFailed("Back alignment failed")
+
+    # Los datos del reverso vienen bajo "text" cuando no se pudo leer la MRZ
+    datos_mrz = back_text.get("datosMRZ", back_text.get("text", {}).get("datosMRZ", {}))
+
+    response = {
+        "front": {"text": front_text},
+        "back": {"qr": qr_value, "text": back_text},
+        "validation": None
+    }
+    try:
+        # Sin QR legible la validación del QR falla en lugar de abortar todas las demás
+        response["validation"] = validate_card(front_text, datos_mrz, face1, face2, qr_value or "")
+    except Exception as e:
+        # Datos incompletos (flash, MRZ ilegible...): devolver lo extraído y el motivo
+        response["validation_error"] = str(e)
+    return response
+
+
+def _batch_item(batch_key, index, name, side, data, mode):
+    item = {"index": index, "name": name, "side": side}
+    try:
+        if side not in ('front', 'back'):
+            raise ValueError("Unknown side; use 'front' or 'back'")
+
+        image = image_utils.decode_image(data)
+        if image is None:
+            raise ValueError("Could not decode image")
+
+        # Todo el lote comparte un turno en el executor de OCR; si está lleno, esperar y reintentar
+        with ocr_executor.scheduling_key(batch_key):
+            for attempt in range(Config.BATCH_SATURATION_RETRIES + 1):
+                try:
+                    if side == 'front':
+                        _, text, _, _ = process_front(image, mode)
+                        item["result"] = {"text": text}
+                    else:
+                        _, text, qr_value = process_back(image, mode)
+                        item["result"] = {"qr": qr_value, "text": text}
+                    break
+                except ocr_executor.ExecutorSaturated:
+                    if attempt == Config.BATCH_SATURATION_RETRIES:
+                        raise
+                    time.sleep(Config.OCR_RETRY_AFTER_SECONDS)
+        item["status"] = "ok"
+    except Exception as e:
+        # Un error en una imagen no interrumpe el resto del lote
+        item["status"] = "error"
+        item["error"] = str(e)
+        if isinstance(e, quality.ImageQualityRejected):
+            item["quality"] = e.report
+    return item
+
+
+def run_batch(items, mode=None):
+    """
+    Process (name, side, encoded image) items on the shared batch pool and yield one result per
+    item as soon as it finishes (not in input order). At most BATCH_MAX_IN_FLIGHT items of a batch
+    are decoded or queued at once, so the input is consumed as the pool frees up.
+    """
+    batch_key = f'batch-{uuid.uuid4().hex}'
+    pending = set()
+    input_error = None
+    try:
+        for index, (name, side, data) in enumerate(items):
+            if len(pending) >= Config.BATCH_MAX_IN_FLIGHT:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+            pending.add(_batch_executor.submit(
+                contextvars.copy_context().run, _batch_item, batch_key, index, name, side, data, mode))
+    except Exception as e:
+        # Archivo truncado o corrupto: entregar lo ya encolado y después el error de lectura
+        input_error = e
+
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            yield future.result()
+
+    if input_error is not None:
+        yield {"status": "error", "error": f"Could not read batch input: {input_error}"}
@@ -0,0 +1,113 @@
+import math
+import time
+import cv2
+import numpy as np
+from settings import Config
+from utils import metrics
+from utils.logger import logger
+
+
+class ImageQualityRejected(Exception):
+    """
+    Raised when an upload fails the pre-alignment quality gate. report holds the structured reasons.
+    """
+
+    def __init__(self, report):
+        checks = ", ".join(issue["check"] for issue in report["issues"] if issue["severity"] == "reject")
+        super().__init__(f"Image quality too low ({report['side']}): {checks}")
+        self.report = report
+
+
+def measure(image, max_side=None):
+    """
+    Cheap quality measurements on a grayscale copy downscaled to at most max_side: resolution of
+    the original, sharpness (variance of the Laplacian), glare (fraction of clipped pixels) and
+    exposure (5th and 95th brightness percentiles).
+    """
+    max_side = max_side or Config.QUALITY_MAX_SIDE
+    height, width = image.shape[:2]
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+
+    # Reducir por un factor entero: INTER_AREA promedia bloques exactos y es varias veces más rápido
+    factor = math.ceil(max(height, width) / max_side)
+    if factor > 1:
+        gray = gray[:height // factor * factor, :width // factor * factor]
+        gray = cv2.resize(gray, (width // factor, height // factor), interpolation=cv2.INTER_AREA)
+
+    _, deviation = cv2.meanStdDev(cv2.Laplacian(gray, cv2.CV_16S))
+
+    # Percentiles desde el histograma: más barato que ordenar los píxeles
+    cumulative = np.cumsum(cv2.calcHist([gray], [0], None, [256], [0, 256]).ravel()) / gray.size
+    return {
+        "width": width,
+        "height": height,
+        "sharpness": round(float(deviation[0, 0]) ** 2, 1),
+        "glare": round(float(1.0 - cumulative[249]), 4),
+        "shadows_p5": int(np.searchsorted(cumulative, 0.05)),
+        "highlights_p95": int(np.searchsorted(cumulative, 0.95))
+    }
+
+
+def _issues(values):
+    # (check, valor, umbral de rechazo, umbral de aviso, True si el valor bajo es el malo, mensaje)
+    checks = (
+        ("resolution", min(values["width"], values["height"]), Config.QUALITY_MIN_SIDE_REJECT,
+         Config.QUALITY_MIN_SIDE_WARN, True, "Image resolution is too low"),
+        ("sharpness", values["sharpness"], Config.QUALITY_SHARPNESS_REJECT,
+         Config.QUALITY_SHARPNESS_WARN, True, "Image is blurry"),
+        ("glare", values["glare"], Config.QUALITY_GLARE_REJECT,
+         Config.QUALITY_GLARE_WARN, False, "Image has glare or clipped highlights"),
+        ("underexposure", values["highlights_p95"], Config.QUALITY_DARK_REJECT,
+         Config.QUALITY_DARK_WARN, True, "Image is too dark"),
+        ("overexposure", values["shadows_p5"], Config.QUALITY_BRIGHT_REJECT,
+         Config.QUALITY_BRIGHT_WARN, False, "Image is overexposed"),
+    )
+
+    issues = []
+    for check, value, reject, warn, low_is_bad, message in checks:
+        for severity, threshold in (("reject", reject), ("warning", warn)):
+            if (value < threshold) if low_is_bad else (value > threshold):
+                issues.append({"check": check, "severity": severity, "value": value,
+                               "threshold": threshold, "message": message})
+                break
+    return issues
+
+
+def assess(image, side):
+    """
+    Run the quality checks on an upload. Returns a report with the status ('ok', 'warning' or
+    'rejected'), the issues found and the measurements.
+    """
+    start = time.perf_counter()
+    with metrics.timer('quality'):
+        values = measure(image)
+        issues = _issues(values)
+
+    severities = {issue["severity"] for issue in issues}
+    status = "rejected" if "reject" in severities else "warning" if issues else "ok"
+    return {
+        "side": side,
+        "status": status,
+        "issues": issues,
+        "metrics": values,
+        "ms": round((time.perf_counter() - start) * 1000, 2)
+    }
+
+
+def check(image, side):
+    """
+    Quality gate run before alignment (QUALITY_GATE: 'reject', 'warn' or 'off'). Raises
+    ImageQualityRejected for rejected uploads in 'reject' mode; warnings are only logged.
+    """
+    if Config.QUALITY_GATE == 'off' or image is None:
+        return None
+
+    report = assess(image, side)
+    metrics.count_quality(side, report["issues"])
+    if report["status"] == "ok":
+        return report
+
+    logger.info(f"Calidad de imagen: {report['status']}", extra={"quality": report})
+    if report["status"] == "rejected" and Config.QUALITY_GATE == 'reject':
+        raise ImageQualityRejected(report)
+    return report
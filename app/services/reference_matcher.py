@@ -0,0 +1,78 @@
+import threading
+import numpy as np
+from utils.keypoint_backends import get_backend
+
+_lock = threading.Lock()
+
+
+class ReferenceMatcher:
+    """
+    Single FLANN index (KD-tree or LSH, depending on the pack's backend) trained over the
+    descriptors of every reference card.
+    Each query runs once against the merged index and the matches vote for their reference.
+    """
+
+    def __init__(self, reference_features):
+        self.reference_features = reference_features
+        self.backend = get_backend(reference_features.manifest['detector'])
+        self.flann = self.backend.create_matcher()
+
+        # Mapear cada índice de imagen del matcher al índice de referencia del pack
+        self.reference_indices = []
+        for index in range(len(reference_features)):
+            descriptors = reference_features.reference_descriptors(index)
+            if len(descriptors) >= 2:
+                self.flann.add([np.ascontiguousarray(descriptors, dtype=self.backend.descriptor_dtype)])
+                self.reference_indices.append(index)
+
+        if self.reference_indices:
+            self.flann.train()
+
+    def vote(self, descriptors, lowe_ratio=0.7):
+        """
+        Return {reference_index: [(query_idx, train_idx), ...]} with the ratio-test survivors per reference.
+        """
+        if not self.reference_indices or descriptors is None or len(descriptors) == 0:
+            return {}
+
+        # Con varias referencias casi iguales los dos vecinos más cercanos suelen caer en cartas distintas,
+        # así que se piden más vecinos y el test de Lowe se aplica dentro de cada referencia.
+        k = min(2 * len(self.reference_indices), 8)
+        k = max(k, 2)
+        knn_matches = self.flann.knnMatch(np.ascontiguousarray(descriptors, dtype=self.backend.descriptor_dtype), k=k)
+
+        votes = {}
+        for neighbours in knn_matches:
+            if not neighbours:
+                continue
+            # El k-ésimo vecino acota por debajo al segundo vecino de cualquier referencia ausente
+            bound = neighbours[-1].distance
+            seen = {}
+            for match in neighbours:
+                first = seen.get(match.imgIdx)
+                if first is None:
+                    seen[match.imgIdx] = [match, None]
+                elif first[1] is None:
+                    first[1] = match
+
+            for img_idx, (best, second) in seen.items():
+                second_distance = second.distance if second is not None else bound
+                if best.distance < lowe_ratio * second_distance:
+                    reference_index = self.reference_indices[img_idx]
+                    votes.setdefault(reference_index, []).append((best.queryIdx, best.trainIdx))
+
+        return votes
+
+
+def get_reference_matcher(reference_features):
+    """
+    Return the merged matcher for a feature pack, training it the first time the pack is used.
+    """
+    matcher = reference_features.matcher
+    if matcher is None:
+        with _lock:
+            matcher = reference_features.matcher
+            if matcher is None:
+                matcher = ReferenceMatcher(reference_features)
+                reference_features.matcher = matcher
+    return matcher
@@ -2,8 +2,9 @@ import cv2
 import re
 from unidecode import unidecode
 from difflib import SequenceMatcher
-from services.face_compare import compare_faces, model, device, transform
+from services.face_compare import compare_faces, compare_face_arrays, get_model, device, transform
 from utils import image_utils
+from utils.logger import logger
 
 def validate_data(front_data, back_data, ruta_img_1, ruta_img_2, qr, threshold=0.8):
     results = {
@@ -17,6 +18,13 @@ def validate_data(front_data, back_data, ruta_img_1, ruta_img_2, qr, threshold=0
     return results
 
 def validate_face(ruta_img_1, ruta_img_2):
+    # Las caras pueden llegar ya decodificadas (almacén de artefactos) o como rutas de archivo
+    if not isinstance(ruta_img_1, str) or not isinstance(ruta_img_2, str):
+        if ruta_img_1 is None or ruta_img_2 is None:
+            return False
+        distance = compare_face_arrays(ruta_img_1, ruta_img_2)
+        return distance < 1  # Umbral de distancia
+
     # Cargar las imágenes desde las rutas de archivo
     img1 = cv2.imread(ruta_img_1)
     img2 = cv2.imread(ruta_img_2)
@@ -24,21 +32,21 @@ def validate_face(ruta_img_1, ruta_img_2):
     if img1 is None or img2 is None:
         return False  # Fallo al cargar una o ambas imágenes
 
-    distance = compare_faces(ruta_img_1, ruta_img_2, model, transform, device)
+    distance = compare_faces(ruta_img_1, ruta_img_2, get_model(), transform, device)
     return distance < 1  # Umbral de distancia
 
 def validate_rut(front_data, back_data, threshold):
     run_front = f"{front_data['RUN']}"
     run_back = back_data.get("rut", "")
     similarity = calculate_similarity(run_front, run_back)
-    print("RUN Similarity:", similarity)
+    logger.debug("RUN similarity", extra={"check": "rut", "similarity": similarity})
     return similarity >= threshold
 
 def validate_doc_id(front_data, back_data, threshold):
     doc_id_front = front_data.get("numero_documento", "")
     doc_id_back = back_data.get("numeroDocumento_MRZ", "")
     similarity = calculate_similarity(doc_id_front, doc_id_back)
-    print("Document ID Similarity:", similarity)
+    logger.debug("Document ID similarity", extra={"check": "doc_id", "similarity": similarity})
     return similarity >= threshold
 
 def validate_dates(front_data, back_data, threshold):
@@ -52,8 +60,9 @@ def validate_dates(front_data, back_data, threshold):
     similarity_nacimiento = calculate_similarity(fecha_nacimiento_front, fecha_nacimiento_back)
     similarity_vencimiento = calculate_similarity(fecha_vencimiento_front, fecha_vencimiento_back)
 
-    print("Fecha Nacimiento Similarity:", similarity_nacimiento)
-    print("Fecha Vencimiento Similarity:", similarity_vencimiento)
+    logger.debug("Date similarity", extra={
+        "check": "dates", "fecha_nacimiento": similarity_nacimiento, "fecha_vencimiento": similarity_vencimiento
+    })
 
     return (similarity_nacimiento >= threshold and similarity_vencimiento >= threshold)
 
@@ -92,9 +101,10 @@ def validate_names_partial(front_data, back_data, threshold):
     similarity_apellido_materno = calculate_name_similarity(apellido_materno_front, apellido_materno_back)
     similarity_nombres = calculate_name_similarity(nombres_front, nombres_back)
 
-    print("Apellido Paterno Similarity:", similarity_apellido_paterno)
-    print("Apellido Materno Similarity:", similarity_apellido_materno)
-    print("Nombres Similarity:", similarity_nombres)
+    logger.debug("Name similarity", extra={
+        "check": "names", "apellido_paterno": similarity_apellido_paterno,
+        "apellido_materno": similarity_apellido_materno, "nombres": similarity_nombres
+    })
 
     return (similarity_apellido_paterno >= threshold and
             similarity_apellido_materno >= threshold and
@@ -158,12 +168,12 @@ def validate_qr(qr, front_data, back_data, threshold):
     similarity_mrz_qr_back = calculate_similarity(qr_data['mrz'], extracted_mrz)
     # print(qr_data['mrz'], extracted_mrz)
 
-    # Mostrar las similitudes calculadas
-    print("Similarity between QR RUN and Front RUN:", similarity_run_qr_front)
-    print("Similarity between QR RUN and Back RUN:", similarity_run_qr_back)
-    print("Similarity between QR Serial and Front Serial:", similarity_serial_qr_front)
-    print("Similarity between QR Serial and Back Serial:", similarity_serial_qr_back)
-    print("Similarity between QR MRZ and Back MRZ:", similarity_mrz_qr_back)
+    # Registrar las similitudes calculadas
+    logger.debug("QR similarity", extra={
+        "check": "qr", "run_front": similarity_run_qr_front, "run_back": similarity_run_qr_back,
+        "serial_front": similarity_serial_qr_front, "serial_back": similarity_serial_qr_back,
+        "mrz_back": similarity_mrz_qr_back
+    })
 
     # Validar si todas las similitudes están por encima del umbral
     valid = (
@@ -7,9 +7,148 @@ load_dotenv()
 class Config:
     SECRET_KEY = os.getenv('SECRET_KEY')
 
+    # Imágenes de referencia y pack de características precalculadas
+    FRONT_REFERENCES_DIR = os.getenv('FRONT_REFERENCES_DIR', './public/front_references')
+    BACK_REFERENCES_DIR = os.getenv('BACK_REFERENCES_DIR', './public/back_references')
+    FEATURE_PACK_DIR = os.getenv('FEATURE_PACK_DIR', './public/feature_packs')
+    FEATURE_PACK_NFEATURES = int(os.getenv('FEATURE_PACK_NFEATURES', '5000'))
+
+    # Alineación piramidal: lado mayor de trabajo (0 desactiva) y umbral de inliers para refinar
+    ALIGN_MAX_SIDE = int(os.getenv('ALIGN_MAX_SIDE', '0'))
+    ALIGN_REFINE_MIN_INLIERS = int(os.getenv('ALIGN_REFINE_MIN_INLIERS', '40'))
+
+    # Backend de puntos clave (sift, orb, akaze) por defecto y para ?mode=fast, con respaldo a SIFT
+    ALIGN_BACKEND = os.getenv('ALIGN_BACKEND', 'sift')
+    ALIGN_FAST_BACKEND = os.getenv('ALIGN_FAST_BACKEND', 'orb')
+    ALIGN_FALLBACK_MIN_INLIERS = int(os.getenv('ALIGN_FALLBACK_MIN_INLIERS', '30'))
+
+    # Tesseract: binario (respaldo sin tesserocr), tessdata y motores precargados por idioma
+    TESSERACT_CMD = os.getenv('TESSERACT_CMD', '/usr/local/bin/tesseract')
+    TESSDATA_PATH = os.getenv('TESSDATA_PATH', '/usr/share/tesseract-ocr/5/tessdata')
+    OCR_ENGINES_PER_LANG = int(os.getenv('OCR_ENGINES_PER_LANG', str(os.cpu_count() or 4)))
+    # Segundos máximos esperando un motor libre antes de fallar la llamada de OCR
+    OCR_ENGINE_LEASE_TIMEOUT = float(os.getenv('OCR_ENGINE_LEASE_TIMEOUT', '30'))
+
+    # Executor compartido de OCR: 'thread' o 'process', número de workers y tareas encoladas máximas
+    OCR_EXECUTOR_MODE = os.getenv('OCR_EXECUTOR_MODE', 'thread')
+    OCR_EXECUTOR_WORKERS = int(os.getenv('OCR_EXECUTOR_WORKERS', str(os.cpu_count() or 4)))
+    OCR_EXECUTOR_MAX_QUEUE = int(os.getenv('OCR_EXECUTOR_MAX_QUEUE', '200'))
+    OCR_RETRY_AFTER_SECONDS = int(os.getenv('OCR_RETRY_AFTER_SECONDS', '2'))
+
+    # OCR del frente: 'per_field' (una llamada por campo) o 'mosaic' (una sola llamada)
+    FRONT_OCR_MODE = os.getenv('FRONT_OCR_MODE', 'per_field')
+
+    # OCR de la MRZ: 'lines' (segmenta las tres líneas y las reconoce en paralelo con --psm 7, reintentando
+    # con 'block' si no las encuentra) o 'block' (toda la zona ampliada 5x con --psm 1). Alto objetivo (px) de cada línea
+    MRZ_OCR_MODE = os.getenv('MRZ_OCR_MODE', 'lines')
+    MRZ_LINE_HEIGHT = int(os.getenv('MRZ_LINE_HEIGHT', '40'))
+
+    # Volcado de segmentos para depuración: desactivado por defecto, muestreado y asíncrono
+    DEBUG_SEGMENTS = os.getenv('DEBUG_SEGMENTS', 'false').lower() == 'true'
+    DEBUG_SEGMENTS_SAMPLE_RATE = float(os.getenv('DEBUG_SEGMENTS_SAMPLE_RATE', '1.0'))
+    DEBUG_SEGMENTS_DIR = os.getenv('DEBUG_SEGMENTS_DIR', './tmp_segments')
+    DEBUG_SEGMENTS_QUEUE_SIZE = int(os.getenv('DEBUG_SEGMENTS_QUEUE_SIZE', '256'))
+
+    # Almacén de artefactos en memoria entre /ocr y /validate (TTL, presupuesto en bytes y nivel compartido opcional)
+    ARTIFACT_MAX_BYTES = int(os.getenv('ARTIFACT_MAX_BYTES', str(256 * 1024 * 1024)))
+    ARTIFACT_TTL_SECONDS = int(os.getenv('ARTIFACT_TTL_SECONDS', '600'))
+    ARTIFACT_SHARED_DIR = os.getenv('ARTIFACT_SHARED_DIR', '')
+    # Seguir guardando las imágenes como archivos y devolver sus rutas (solo para clientes antiguos que las usan)
+    LEGACY_TEMP_FILES = os.getenv('LEGACY_TEMP_FILES', 'false').lower() == 'true'
+
+    # Carpetas ./tmp y ./static: tamaño máximo, antigüedad máxima y periodo de limpieza por carpeta
+    STORAGE_MAX_BYTES = int(os.getenv('STORAGE_MAX_BYTES', str(1024 * 1024 * 1024)))
+    STORAGE_MAX_AGE_SECONDS = int(os.getenv('STORAGE_MAX_AGE_SECONDS', str(24 * 3600)))
+    STORAGE_EVICTION_INTERVAL = int(os.getenv('STORAGE_EVICTION_INTERVAL', '60'))
+
+    # Embeddings faciales: entradas máximas en caché y cálculo anticipado al recortar las caras
+    FACE_EMBEDDING_CACHE_SIZE = int(os.getenv('FACE_EMBEDDING_CACHE_SIZE', '1024'))
+    FACE_EMBED_EAGER = os.getenv('FACE_EMBED_EAGER', 'true').lower() == 'true'
+
+    # Micro-lotes de inferencia facial: tamaño máximo del lote y espera máxima (ms) para llenarlo
+    FACE_BATCH_MAX_SIZE = int(os.getenv('FACE_BATCH_MAX_SIZE', '16'))
+    FACE_BATCH_MAX_WAIT_MS = float(os.getenv('FACE_BATCH_MAX_WAIT_MS', '5'))
+
+    # Inferencia facial en CPU: variante (fp32, int8, torchscript, int8_torchscript), channels-last
+    # o un artefacto TorchScript exportado con cli.py export-face-model
+    FACE_MODEL_VARIANT = os.getenv('FACE_MODEL_VARIANT', 'fp32')
+    FACE_MODEL_CHANNELS_LAST = os.getenv('FACE_MODEL_CHANNELS_LAST', 'false').lower() == 'true'
+    FACE_MODEL_ARTIFACT = os.getenv('FACE_MODEL_ARTIFACT', '')
+
+    # Arranque: pasar una petición sintética por cada flujo antes de declararse listo (/readyz)
+    WARMUP_SYNTHETIC_REQUESTS = os.getenv('WARMUP_SYNTHETIC_REQUESTS', 'true').lower() == 'true'
+    # Reintentos de las etapas de arranque fallidas, con espera exponencial (segundos, con tope)
+    STARTUP_RETRIES = int(os.getenv('STARTUP_RETRIES', '5'))
+    STARTUP_RETRY_BACKOFF = float(os.getenv('STARTUP_RETRY_BACKOFF', '2'))
+    STARTUP_RETRY_MAX_BACKOFF = float(os.getenv('STARTUP_RETRY_MAX_BACKOFF', '60'))
+
+    # Servidor de producción (gunicorn.conf.py): procesos, hilos por proceso, precarga en el maestro
+    WEB_BIND = os.getenv('WEB_BIND', '0.0.0.0:5000')
+    WEB_WORKERS = int(os.getenv('WEB_WORKERS', '2'))
+    WEB_THREADS = int(os.getenv('WEB_THREADS', '4'))
+    WEB_TIMEOUT = int(os.getenv('WEB_TIMEOUT', '120'))
+    WEB_PRELOAD = os.getenv('WEB_PRELOAD', 'true').lower() == 'true'
+    # Hilos de torch por proceso (0 = repartir los núcleos entre los workers)
+    TORCH_THREADS = int(os.getenv('TORCH_THREADS', '0'))
+
+    # Modo asíncrono (asgi.py): peticiones en ejecución, cola de admisión, espera máxima (s) y Retry-After
+    ASGI_WORKERS = int(os.getenv('ASGI_WORKERS', '4'))
+    ASGI_MAX_QUEUE = int(os.getenv('ASGI_MAX_QUEUE', '16'))
+    ASGI_QUEUE_TIMEOUT = float(os.getenv('ASGI_QUEUE_TIMEOUT', '10'))
+    ASGI_RETRY_AFTER_SECONDS = int(os.getenv('ASGI_RETRY_AFTER_SECONDS', '2'))
+
+    # /api/verify: hilos que procesan el reverso en paralelo al anverso. Con menos hilos que
+    # peticiones concurrentes los reversos se encolan; 0 = tantos como peticiones puede atender
+    # un proceso (WEB_THREADS con gunicorn, ASGI_WORKERS en modo asíncrono)
+    VERIFY_WORKERS = int(os.getenv('VERIFY_WORKERS', '0')) or max(WEB_THREADS, ASGI_WORKERS)
+
+    # /api/batch: hilos del pool compartido, imágenes en curso por lote y reintentos si el OCR está lleno
+    BATCH_WORKERS = int(os.getenv('BATCH_WORKERS', '4'))
+    BATCH_MAX_IN_FLIGHT = int(os.getenv('BATCH_MAX_IN_FLIGHT', '8'))
+    BATCH_SATURATION_RETRIES = int(os.getenv('BATCH_SATURATION_RETRIES', '3'))
+
+    # Métricas Prometheus en /metrics (requiere prometheus_client) y refresco de las colas
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+    METRICS_QUEUE_REFRESH_SECONDS = float(os.getenv('METRICS_QUEUE_REFRESH_SECONDS', '5'))
+
+    # Perfilado bajo demanda: cabecera con el secreto (vacío = deshabilitado) o muestreo aleatorio
+    PROFILE_HEADER = os.getenv('PROFILE_HEADER', 'X-Profile')
+    PROFILE_SECRET = os.getenv('PROFILE_SECRET', '')
+    PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', '0'))
+    PROFILE_DIR = os.getenv('PROFILE_DIR', './tmp/profiles')
+    PROFILE_MAX_FILES = int(os.getenv('PROFILE_MAX_FILES', '50'))
+    PROFILE_TOP_FUNCTIONS = int(os.getenv('PROFILE_TOP_FUNCTIONS', '30'))
+
+    # Logging: nivel, formato ('json' o 'text'), archivo rotativo (vacío = solo stderr) y tamaño de la cola
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+    LOG_FORMAT = os.getenv('LOG_FORMAT', 'json')
+    LOG_FILE = os.getenv('LOG_FILE', 'logs/app.log')
+    LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+
+    # Filtro de calidad antes de alinear ('reject', 'warn' u 'off'), medido sobre una copia reducida a QUALITY_MAX_SIDE.
+    # Umbrales de rechazo y de aviso: lado menor (px), varianza del laplaciano, fracción de píxeles saturados,
+    # percentil 95 de brillo (imagen oscura) y percentil 5 de brillo (imagen sobreexpuesta)
+    # 'warn' por defecto: los umbrales aún no están calibrados con tráfico real (ver card_quality_issues_total)
+    QUALITY_GATE = os.getenv('QUALITY_GATE', 'warn')
+    QUALITY_MAX_SIDE = int(os.getenv('QUALITY_MAX_SIDE', '640'))
+    QUALITY_MIN_SIDE_REJECT = int(os.getenv('QUALITY_MIN_SIDE_REJECT', '360'))
+    QUALITY_MIN_SIDE_WARN = int(os.getenv('QUALITY_MIN_SIDE_WARN', '540'))
+    QUALITY_SHARPNESS_REJECT = float(os.getenv('QUALITY_SHARPNESS_REJECT', '25'))
+    QUALITY_SHARPNESS_WARN = float(os.getenv('QUALITY_SHARPNESS_WARN', '100'))
+    QUALITY_GLARE_REJECT = float(os.getenv('QUALITY_GLARE_REJECT', '0.5'))
+    QUALITY_GLARE_WARN = float(os.getenv('QUALITY_GLARE_WARN', '0.15'))
+    QUALITY_DARK_REJECT = int(os.getenv('QUALITY_DARK_REJECT', '90'))
+    QUALITY_DARK_WARN = int(os.getenv('QUALITY_DARK_WARN', '120'))
+    QUALITY_BRIGHT_REJECT = int(os.getenv('QUALITY_BRIGHT_REJECT', '200'))
+    QUALITY_BRIGHT_WARN = int(os.getenv('QUALITY_BRIGHT_WARN', '170'))
+
 class DevelopmentConfig(Config):
     DEBUG = True
 
+class ProductionConfig(Config):
+    DEBUG = False
+
 config = {
-    'development': DevelopmentConfig
+    'development': DevelopmentConfig,
+    'production': ProductionConfig
 }
@@ -0,0 +1,82 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+
+class AdmissionRejected(Exception):
+    """
+    Raised when the admission queue is full and a request is turned away without waiting.
+    """
+
+
+class AdmissionTimeout(Exception):
+    """
+    Raised when an admitted request waited too long for a free execution slot.
+    """
+
+
+class AdmissionController:
+    """
+    Bounds the requests in flight in the asyncio front end.
+
+    Up to max_running requests run at once; up to max_queue more wait for a slot (for at most
+    max_wait seconds). Anything beyond that is rejected immediately, so overload surfaces as fast
+    rejections instead of a growing backlog. Must be used from a single event loop.
+    """
+
+    def __init__(self, max_running, max_queue, max_wait=None):
+        self.max_running = max_running
+        self.max_queue = max_queue
+        self.max_wait = max_wait or None
+        self._semaphore = asyncio.Semaphore(max_running)
+        self._admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    @asynccontextmanager
+    async def reserve(self):
+        """
+        Take a place in the queue, or raise AdmissionRejected right away if it is full. Cheap enough
+        to do before reading the request body, so overload is answered without receiving uploads.
+        """
+        if self._admitted >= self.max_running + self.max_queue:
+            self.rejected += 1
+            raise AdmissionRejected(
+                f"admission queue is full ({self._admitted} in flight, limit {self.max_running + self.max_queue})")
+
+        self._admitted += 1
+        try:
+            yield
+        finally:
+            self._admitted -= 1
+
+    @asynccontextmanager
+    async def slot(self):
+        """
+        Wait (at most max_wait seconds) for one of the max_running execution slots. Must be used
+        inside reserve().
+        """
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.max_wait)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            raise AdmissionTimeout(f"no execution slot freed up within {self.max_wait}s")
+        try:
+            yield
+        finally:
+            self._semaphore.release()
+
+    @asynccontextmanager
+    async def admit(self):
+        async with self.reserve(), self.slot():
+            yield
+
+    def stats(self):
+        running = self.max_running - self._semaphore._value
+        return {
+            "running": running,
+            "queued": self._admitted - running,
+            "max_running": self.max_running,
+            "max_queue": self.max_queue,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out
+        }
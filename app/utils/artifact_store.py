@@ -0,0 +1,122 @@
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+import numpy as np
+from settings import Config
+
+
+class ArtifactStore:
+    """
+    Decoded images kept in memory under opaque IDs between requests.
+
+    Entries expire after ttl seconds and the least recently used ones are evicted once the
+    byte budget is exceeded. With a shared directory (ideally tmpfs such as /dev/shm) every
+    entry is also written as a raw .npy file so that any worker process can resolve the ID.
+    """
+
+    def __init__(self, max_bytes, ttl, shared_dir=None):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.shared_dir = shared_dir or None
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._last_sweep = time.monotonic()
+        if self.shared_dir:
+            os.makedirs(self.shared_dir, exist_ok=True)
+
+    def put(self, array):
+        """
+        Store an array and return its ID.
+        """
+        array = np.ascontiguousarray(array)
+        artifact_id = uuid.uuid4().hex
+        now = time.monotonic()
+
+        with self._lock:
+            self._entries[artifact_id] = (array, now + self.ttl)
+            self._bytes += array.nbytes
+            self._evict(now)
+
+        if self.shared_dir:
+            # Escribir y renombrar para que otros procesos nunca lean un archivo a medias
+            path = self._shared_path(artifact_id)
+            np.save(f'{path}.tmp.npy', array)
+            os.replace(f'{path}.tmp.npy', path)
+            self._sweep_shared()
+
+        return artifact_id
+
+    def get(self, artifact_id):
+        """
+        Return the array stored under an ID, or None if it is unknown or expired.
+        """
+        if not artifact_id or not all(c in '0123456789abcdef' for c in artifact_id):
+            return None
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(artifact_id)
+            if entry is not None:
+                array, expires_at = entry
+                if expires_at > now:
+                    self._entries.move_to_end(artifact_id)
+                    return array
+                self._remove(artifact_id)
+
+        if self.shared_dir:
+            path = self._shared_path(artifact_id)
+            try:
+                if time.time() - os.path.getmtime(path) < self.ttl:
+                    return np.load(path)
+            except OSError:
+                pass
+        return None
+
+    def delete(self, artifact_id):
+        with self._lock:
+            if artifact_id in self._entries:
+                self._remove(artifact_id)
+        if self.shared_dir:
+            try:
+                os.remove(self._shared_path(artifact_id))
+            except OSError:
+                pass
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes, "max_bytes": self.max_bytes}
+
+    def _shared_path(self, artifact_id):
+        return os.path.join(self.shared_dir, f'{artifact_id}.npy')
+
+    def _remove(self, artifact_id):
+        array, _ = self._entries.pop(artifact_id)
+        self._bytes -= array.nbytes
+
+    def _evict(self, now):
+        # Primero los expirados, después los menos usados hasta respetar el presupuesto
+        for artifact_id in [key for key, (_, expires_at) in self._entries.items() if expires_at <= now]:
+            self._remove(artifact_id)
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            self._remove(next(iter(self._entries)))
+
+    def _sweep_shared(self):
+        now = time.monotonic()
+        if now - self._last_sweep < min(self.ttl, 60):
+            return
+        self._last_sweep = now
+
+        cutoff = time.time() - self.ttl
+        for filename in os.listdir(self.shared_dir):
+            path = os.path.join(self.shared_dir, filename)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError:
+                pass
+
+
+store = ArtifactStore(Config.ARTIFACT_MAX_BYTES, Config.ARTIFACT_TTL_SECONDS, Config.ARTIFACT_SHARED_DIR)
@@ -0,0 +1,61 @@
+import os
+import tarfile
+import tempfile
+import zipfile
+
+SIDES = ('front', 'back')
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.tif', '.tiff', '.webp')
+
+
+def side_from_name(name, default=None):
+    """
+    Infer the card side of an archive member from its folder (front/..., back/...) or its file
+    name prefix (front_..., back-...), falling back to the default side.
+    """
+    parts = name.replace('\\', '/').lower().split('/')
+    for part in parts[:-1]:
+        if part in SIDES:
+            return part
+    for side in SIDES:
+        if parts[-1].startswith(side):
+            return side
+    return default
+
+
+def spool(chunks, max_memory=8 * 1024 * 1024):
+    """
+    Copy a stream of byte chunks to a seekable temporary file (in memory while it is small).
+    """
+    spooled = tempfile.SpooledTemporaryFile(max_size=max_memory)
+    for chunk in chunks:
+        spooled.write(chunk)
+    spooled.seek(0)
+    return spooled
+
+
+def iter_archive(fileobj, default_side=None):
+    """
+    Yield (name, side, data) for every image in a zip or tar archive.
+
+    Zip archives need a seekable file; tar archives (optionally compressed) are read as a stream,
+    one member at a time, so a large upload is never held in memory at once.
+    """
+    if fileobj.seekable() and zipfile.is_zipfile(fileobj):
+        fileobj.seek(0)
+        with zipfile.ZipFile(fileobj) as archive:
+            for info in archive.infolist():
+                if not info.is_dir() and is_image(info.filename):
+                    yield info.filename, side_from_name(info.filename, default_side), archive.read(info)
+        return
+
+    if fileobj.seekable():
+        fileobj.seek(0)
+    with tarfile.open(fileobj=fileobj, mode='r|*') as archive:
+        for member in archive:
+            if member.isfile() and is_image(member.name):
+                yield member.name, side_from_name(member.name, default_side), archive.extractfile(member).read()
+
+
+def is_image(name):
+    base = os.path.basename(name)
+    return not base.startswith('.') and base.lower().endswith(IMAGE_EXTENSIONS)
@@ -0,0 +1,56 @@
+import os
+import queue
+import random
+import threading
+import time
+import uuid
+import cv2
+from settings import Config
+from utils.logger import logger
+
+_queue = queue.Queue(maxsize=Config.DEBUG_SEGMENTS_QUEUE_SIZE)
+_writer = None
+_lock = threading.Lock()
+
+
+def start_request():
+    """
+    Decide whether this request dumps its segments and return its own directory, or None.
+    With dumping disabled (the default) no encoding or filesystem work happens at all.
+    """
+    if not Config.DEBUG_SEGMENTS or random.random() >= Config.DEBUG_SEGMENTS_SAMPLE_RATE:
+        return None
+    return os.path.join(Config.DEBUG_SEGMENTS_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}")
+
+
+def dump(request_dir, name, image):
+    """
+    Queue an image to be written as <request_dir>/<name>.jpg by the background writer.
+    Dumps are dropped, never waited on, when the writer falls behind.
+    """
+    if request_dir is None:
+        return
+    _ensure_writer()
+    try:
+        _queue.put_nowait((request_dir, name, image))
+    except queue.Full:
+        pass
+
+
+def _ensure_writer():
+    global _writer
+    if _writer is None:
+        with _lock:
+            if _writer is None:
+                _writer = threading.Thread(target=_write_loop, name='debug-dump-writer', daemon=True)
+                _writer.start()
+
+
+def _write_loop():
+    while True:
+        request_dir, name, image = _queue.get()
+        try:
+            os.makedirs(request_dir, exist_ok=True)
+            cv2.imwrite(os.path.join(request_dir, f'{name}.jpg'), image)
+        except Exception as e:
+            logger.warning(f"Error al guardar el segmento de depuración {name}: {e}")
@@ -0,0 +1,110 @@
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ProcessPoolExecutor
+
+
+class ExecutorSaturated(Exception):
+    """
+    Raised when an executor's queue is full and new work is rejected.
+    """
+
+
+class FairExecutor:
+    """
+    Size-bounded executor that serves its callers round-robin.
+
+    Work is queued per key (one key per request) and workers take one task from each key in turn,
+    so a request with many tasks cannot starve the others. The total number of queued tasks is
+    capped; once full, submissions fail fast with ExecutorSaturated. In 'process' mode the tasks
+    run in a process pool of the same size, and the worker threads only dispatch them.
+    """
+
+    def __init__(self, max_workers, max_queue, mode='thread', name='executor'):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.mode = mode
+        self.name = name
+        self._queues = OrderedDict()
+        self._pending = 0
+        self._running = 0
+        self._condition = threading.Condition()
+        self._workers = []
+        self._process_pool = ProcessPoolExecutor(max_workers) if mode == 'process' else None
+
+    def _start_workers(self):
+        while len(self._workers) < self.max_workers:
+            worker = threading.Thread(target=self._work, name=f'{self.name}-{len(self._workers)}', daemon=True)
+            self._workers.append(worker)
+            worker.start()
+
+    def submit_all(self, key, calls):
+        """
+        Queue [(fn, args), ...] for one caller atomically and return their futures in order.
+        """
+        futures = []
+        with self._condition:
+            if self._pending + len(calls) > self.max_queue:
+                raise ExecutorSaturated(
+                    f"{self.name} queue is full ({self._pending} pending, limit {self.max_queue})")
+
+            self._start_workers()
+            tasks = self._queues.setdefault(key, deque())
+            for fn, args in calls:
+                future = Future()
+                tasks.append((future, fn, args))
+                futures.append(future)
+            self._pending += len(calls)
+            self._condition.notify(len(calls))
+        return futures
+
+    def submit(self, key, fn, *args):
+        return self.submit_all(key, [(fn, args)])[0]
+
+    def _next_task(self):
+        with self._condition:
+            while not self._queues:
+                self._condition.wait()
+
+            # Tomar una tarea de la petición más antigua en el turno y mandarla al final de la fila
+            key, tasks = next(iter(self._queues.items()))
+            task = tasks.popleft()
+            if tasks:
+                self._queues.move_to_end(key)
+            else:
+                del self._queues[key]
+            self._pending -= 1
+            self._running += 1
+            return task
+
+    def _work(self):
+        while True:
+            future, fn, args = self._next_task()
+            try:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    if self._process_pool is not None:
+                        result = self._process_pool.submit(fn, *args).result()
+                    else:
+                        result = fn(*args)
+                except BaseException as e:
+                    future.set_exception(e)
+                else:
+                    future.set_result(result)
+            finally:
+                with self._condition:
+                    self._running -= 1
+
+    def stats(self):
+        """
+        Return the current queue depth, running tasks and number of waiting callers.
+        """
+        with self._condition:
+            return {
+                "pending": self._pending,
+                "running": self._running,
+                "callers": len(self._queues),
+                "max_queue": self.max_queue,
+                "workers": self.max_workers,
+                "mode": self.mode
+            }
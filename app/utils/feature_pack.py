@@ -0,0 +1,212 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import cv2
+import numpy as np
+from utils.keypoint_backends import get_backend
+
+# Versión del formato en disco; incrementarla invalida los packs existentes
+FEATURE_PACK_VERSION = 2
+
+# Extensiones de imagen aceptadas como referencia (mismas que path_utils)
+REFERENCE_EXTENSIONS = ('.jpg', '.png')
+
+_packs = {}
+_lock = threading.Lock()
+
+
+class FeaturePack:
+    """
+    Keypoints and descriptors of a reference folder, memory-mapped from disk.
+    """
+
+    def __init__(self, path, manifest, keypoints, descriptors):
+        self.path = path
+        self.manifest = manifest
+        self.keypoints = keypoints
+        self.descriptors = descriptors
+        self.references = manifest['references']
+        # Índice de búsqueda entrenado de forma perezosa sobre todos los descriptores
+        self.matcher = None
+
+    def __len__(self):
+        return len(self.references)
+
+    def reference_points(self, index):
+        """
+        Return the (x, y) keypoint coordinates of one reference image.
+        """
+        ref = self.references[index]
+        return self.keypoints[ref['start']:ref['end'], :2]
+
+    def reference_descriptors(self, index):
+        """
+        Return the descriptors of one reference image.
+        """
+        ref = self.references[index]
+        return self.descriptors[ref['start']:ref['end']]
+
+    def reference_shape(self, index):
+        """
+        Return the (height, width) of one reference image.
+        """
+        height, width = self.references[index]['shape']
+        return height, width
+
+
+def reference_signature(reference_folder, nfeatures, backend='sift'):
+    """
+    Hash the file names, sizes and modification times of a reference folder.
+    """
+    entries = []
+    for filename in sorted(os.listdir(reference_folder)):
+        if filename.endswith(REFERENCE_EXTENSIONS):
+            stat = os.stat(os.path.join(reference_folder, filename))
+            entries.append([filename, stat.st_size, stat.st_mtime_ns])
+
+    payload = json.dumps([FEATURE_PACK_VERSION, backend, nfeatures, entries]).encode('utf-8')
+    return hashlib.sha1(payload).hexdigest()[:16]
+
+
+def _keypoints_to_array(keypoints):
+    return np.array(
+        [(kp.pt[0], kp.pt[1], kp.size, kp.angle, kp.response, kp.octave, kp.class_id) for kp in keypoints],
+        dtype=np.float32
+    ).reshape(-1, 7)
+
+
+def _extract_features(images, nfeatures, backend):
+    """
+    Run the detector over (filename, image) pairs and return stacked keypoints, descriptors and reference entries.
+    """
+    keypoint_backend = get_backend(backend)
+    keypoints_all, descriptors_all, references = [], [], []
+    start = 0
+
+    for filename, image in images:
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        keypoints, descriptors = keypoint_backend.detect_and_compute(gray, nfeatures)
+        if descriptors is None:
+            continue
+
+        keypoints_all.append(_keypoints_to_array(keypoints))
+        descriptors_all.append(descriptors.astype(keypoint_backend.descriptor_dtype))
+        references.append({
+            "file": filename,
+            "shape": [image.shape[0], image.shape[1]],
+            "start": start,
+            "end": start + len(keypoints)
+        })
+        start += len(keypoints)
+
+    keypoints = np.concatenate(keypoints_all) if keypoints_all else np.zeros((0, 7), np.float32)
+    descriptors = np.concatenate(descriptors_all) if descriptors_all else \
+        np.zeros((0, keypoint_backend.descriptor_size), keypoint_backend.descriptor_dtype)
+    return keypoints, descriptors, references
+
+
+def _read_reference_images(reference_folder):
+    for filename in sorted(os.listdir(reference_folder)):
+        if filename.endswith(REFERENCE_EXTENSIONS):
+            image = cv2.imread(os.path.join(reference_folder, filename))
+            if image is not None:
+                yield filename, image
+
+
+def features_from_images(reference_images, nfeatures=5000, backend='sift'):
+    """
+    Build an in-memory feature pack from already loaded reference images.
+    """
+    images = ((f'reference_{index}', image) for index, image in enumerate(reference_images))
+    keypoints, descriptors, references = _extract_features(images, nfeatures, backend)
+    manifest = {
+        "version": FEATURE_PACK_VERSION,
+        "detector": backend,
+        "nfeatures": nfeatures,
+        "references": references
+    }
+    return FeaturePack(None, manifest, keypoints, descriptors)
+
+
+def build_feature_pack(reference_folder, pack_root, name, nfeatures=5000, backend='sift'):
+    """
+    Extract keypoint features from every reference image and persist them as a versioned pack.
+    """
+    signature = reference_signature(reference_folder, nfeatures, backend)
+    pack_path = os.path.join(pack_root, name, f'v{FEATURE_PACK_VERSION}-{signature}')
+    if os.path.exists(os.path.join(pack_path, 'manifest.json')):
+        return pack_path
+
+    keypoints, descriptors, references = _extract_features(_read_reference_images(reference_folder), nfeatures, backend)
+
+    manifest = {
+        "version": FEATURE_PACK_VERSION,
+        "detector": backend,
+        "nfeatures": nfeatures,
+        "signature": signature,
+        "created_at": time.time(),
+        "references": references
+    }
+
+    # Escribir en un directorio temporal y renombrar para que la publicación sea atómica
+    tmp_path = f'{pack_path}.tmp-{os.getpid()}-{threading.get_ident()}'
+    os.makedirs(tmp_path, exist_ok=True)
+    np.save(os.path.join(tmp_path, 'keypoints.npy'), keypoints)
+    np.save(os.path.join(tmp_path, 'descriptors.npy'), descriptors)
+    with open(os.path.join(tmp_path, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    try:
+        os.rename(tmp_path, pack_path)
+    except OSError:
+        # Otro proceso publicó el mismo pack primero
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+    _prune_old_packs(os.path.join(pack_root, name), keep=os.path.basename(pack_path))
+    return pack_path
+
+
+def _prune_old_packs(pack_dir, keep):
+    for entry in os.listdir(pack_dir):
+        if entry != keep and '.tmp-' not in entry:
+            shutil.rmtree(os.path.join(pack_dir, entry), ignore_errors=True)
+
+
+def load_feature_pack(pack_path):
+    """
+    Memory-map a feature pack from disk.
+    """
+    with open(os.path.join(pack_path, 'manifest.json')) as f:
+        manifest = json.load(f)
+
+    if manifest.get('version') != FEATURE_PACK_VERSION:
+        raise ValueError(f"Unsupported feature pack version in {pack_path}: {manifest.get('version')}")
+
+    keypoints = np.load(os.path.join(pack_path, 'keypoints.npy'), mmap_mode='r')
+    descriptors = np.load(os.path.join(pack_path, 'descriptors.npy'), mmap_mode='r')
+    return FeaturePack(pack_path, manifest, keypoints, descriptors)
+
+
+def get_feature_pack(reference_folder, pack_root, name, nfeatures=5000, backend='sift', check_interval=2.0):
+    """
+    Return the cached feature pack for a reference folder, rebuilding it when the folder changes.
+    """
+    now = time.monotonic()
+    cached = _packs.get(name)
+    if cached is not None and now - cached['checked_at'] < check_interval:
+        return cached['pack']
+
+    with _lock:
+        cached = _packs.get(name)
+        signature = reference_signature(reference_folder, nfeatures, backend)
+
+        if cached is None or cached['signature'] != signature:
+            pack_path = build_feature_pack(reference_folder, pack_root, name, nfeatures, backend)
+            cached = {"signature": signature, "pack": load_feature_pack(pack_path)}
+
+        cached['checked_at'] = now
+        _packs[name] = cached
+        return cached['pack']
@@ -1,8 +1,8 @@
 import cv2
 import numpy as np
 import os
-import hashlib
-import time
+from utils import metrics, storage
+from utils.logger import logger
 
 def load_image(image_path):
     """
@@ -14,22 +14,22 @@ def read_image(file):
     """
     Read an image from a file without resizing it.
     """
-    image_cv2 = np.frombuffer(file.read(), np.uint8)
-    return cv2.imdecode(image_cv2, cv2.IMREAD_COLOR)
+    return decode_image(file.read())
 
-def save_image_temp(image, folder='./tmp'):
+def decode_image(data):
     """
-    Save an image temporarily in the specified folder with a unique name based on a hash.
+    Decode an encoded image (JPEG, PNG...) held in memory without resizing it.
     """
-    if not os.path.exists(folder):
-        os.makedirs(folder)
-
-    timestamp = str(time.time()).encode('utf-8')
-    file_hash = hashlib.md5(timestamp).hexdigest()
-    temp_image_path = os.path.join(folder, f'normalized_image_{file_hash}.jpg')
+    with metrics.timer('decode'):
+        image_cv2 = np.frombuffer(data, np.uint8)
+        return cv2.imdecode(image_cv2, cv2.IMREAD_COLOR)
 
-    cv2.imwrite(temp_image_path, image)
-    return temp_image_path
+def save_image_temp(image, folder='./tmp'):
+    """
+    Save an image temporarily in the specified folder, named and sharded by its content hash.
+    Old files are evicted in the background by the folder's content store.
+    """
+    return storage.get_store(folder).save_image(image, 'normalized_image')
 
 def delete_temp_file(file_path):
     """
@@ -39,7 +39,7 @@ def delete_temp_file(file_path):
         if os.path.exists(file_path):
             os.remove(file_path)
     except Exception as e:
-        print(f"Error deleting file {file_path}: {e}")
+        logger.warning(f"Error deleting file {file_path}: {e}")
 
 def preprocesar_segmento(image):
     """
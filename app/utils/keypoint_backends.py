@@ -0,0 +1,98 @@
+import cv2
+import numpy as np
+
+# Parámetros FLANN para descriptores de punto flotante (KD-tree) y binarios (LSH)
+FLANN_INDEX_KDTREE = 1
+FLANN_INDEX_LSH = 6
+
+
+class KeypointBackend:
+    """
+    Detector/descriptor plus the FLANN index that suits its descriptors.
+    """
+    name = None
+    descriptor_dtype = np.float32
+    descriptor_size = 0
+
+    def create_detector(self, nfeatures):
+        raise NotImplementedError
+
+    def create_matcher(self):
+        raise NotImplementedError
+
+    def detect_and_compute(self, gray, nfeatures):
+        return self.create_detector(nfeatures).detectAndCompute(gray, None)
+
+
+class SiftBackend(KeypointBackend):
+    name = 'sift'
+    descriptor_dtype = np.float32
+    descriptor_size = 128
+
+    def create_detector(self, nfeatures):
+        return cv2.SIFT_create(nfeatures=nfeatures)
+
+    def create_matcher(self):
+        return cv2.FlannBasedMatcher(dict(algorithm=FLANN_INDEX_KDTREE, trees=5), dict(checks=50))
+
+
+class BinaryBackend(KeypointBackend):
+    """
+    Base for binary descriptors, matched by Hamming distance through a multi-probe LSH index.
+    """
+    descriptor_dtype = np.uint8
+
+    def create_matcher(self):
+        return cv2.FlannBasedMatcher(
+            dict(algorithm=FLANN_INDEX_LSH, table_number=6, key_size=20, multi_probe_level=1),
+            dict(checks=50)
+        )
+
+
+class OrbBackend(BinaryBackend):
+    name = 'orb'
+    descriptor_size = 32
+
+    def create_detector(self, nfeatures):
+        return cv2.ORB_create(nfeatures=nfeatures)
+
+
+class AkazeBackend(BinaryBackend):
+    name = 'akaze'
+    descriptor_size = 61
+
+    def create_detector(self, nfeatures):
+        return cv2.AKAZE_create()
+
+    def detect_and_compute(self, gray, nfeatures):
+        # AKAZE no limita el número de puntos; conservar los de mayor respuesta
+        keypoints, descriptors = self.create_detector(nfeatures).detectAndCompute(gray, None)
+        if descriptors is None or len(keypoints) <= nfeatures:
+            return keypoints, descriptors
+
+        order = np.argsort([-kp.response for kp in keypoints])[:nfeatures]
+        return tuple(keypoints[i] for i in order), descriptors[order]
+
+
+BACKENDS = {
+    'sift': SiftBackend(),
+    'orb': OrbBackend(),
+    'akaze': AkazeBackend()
+}
+
+
+def get_backend(name):
+    """
+    Return the keypoint backend registered under name.
+    """
+    try:
+        return BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown keypoint backend '{name}'. Available: {', '.join(BACKENDS)}")
+
+
+def ratio_test(knn_matches, lowe_ratio):
+    """
+    Lowe's ratio test that tolerates the short neighbour lists LSH may return.
+    """
+    return [pair[0] for pair in knn_matches if len(pair) == 2 and pair[0].distance < lowe_ratio * pair[1].distance]
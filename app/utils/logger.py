@@ -1,27 +1,129 @@
-import logging
-from logging.handlers import RotatingFileHandler
-import os
-
-def setup_logger(name="app_logger", log_file="logs/app.log", level=logging.INFO):
-    logger = logging.getLogger(name)
-    logger.setLevel(level)
-
-    if not logger.handlers:
-        os.makedirs(os.path.dirname(log_file), exist_ok=True)
-
-        formatter = logging.Formatter(
-            "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-        )
-
-        file_handler = RotatingFileHandler(log_file, maxBytes=5 * 1024 * 1024, backupCount=3)
-        file_handler.setFormatter(formatter)
-
-        console_handler = logging.StreamHandler()
-        console_handler.setFormatter(formatter)
-
-        logger.addHandler(file_handler)
-        logger.addHandler(console_handler)
-
-    return logger
-
-logger = setup_logger()
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from settings import Config
+from utils import request_context
+
+# Atributos propios de LogRecord: el resto viene de extra={...} y se emite como campo del JSON
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime', 'request_id'}
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line: time, level, logger, module, message, request_id and any extra fields.
+    """
+
+    def format(self, record):
+        entry = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S") + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "module": record.module,
+            "message": record.getMessage(),
+            "request_id": getattr(record, 'request_id', None)
+        }
+        entry.update((key, value) for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES)
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class RequestQueueHandler(QueueHandler):
+    """
+    Hand records to the listener thread without ever blocking the caller: the request ID is
+    captured here, on the request thread, and records are dropped when the queue is full.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Resolver mensaje y traza aquí: los argumentos y el traceback no viajan por la cola
+        record = copy.copy(record)
+        record.request_id = request_context.get_request_id()
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.exc_info, record.stack_info = None, None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_handler = None
+_listener = None
+_lock = threading.Lock()
+
+
+def _output_handlers(log_file, formatter):
+    handlers = [logging.StreamHandler(sys.stderr)]
+    if log_file:
+        os.makedirs(os.path.dirname(log_file) or '.', exist_ok=True)
+        handlers.append(RotatingFileHandler(log_file, maxBytes=5 * 1024 * 1024, backupCount=3))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    return handlers
+
+
+def _start_listener(handlers):
+    global _listener
+    _handler.queue = queue.Queue(Config.LOG_QUEUE_SIZE)
+    _listener = QueueListener(_handler.queue, *handlers, respect_handler_level=True)
+    _listener.start()
+
+
+def _restart_after_fork():
+    # El hilo del listener no sobrevive al fork (workers de gunicorn, pool de bulk): uno nuevo por proceso
+    if _listener is not None:
+        _start_listener(_listener.handlers)
+
+
+def _stop_listener():
+    if _listener is not None:
+        try:
+            _listener.stop()
+        except queue.Full:
+            pass
+
+
+def setup_logger(name="app_logger", log_file=Config.LOG_FILE, level=Config.LOG_LEVEL):
+    """
+    Configure the application logger: records go through a queue to a listener thread that
+    writes them to stderr and to the rotating log file (JSON lines unless LOG_FORMAT=text).
+    """
+    global _handler
+    logger = logging.getLogger(name)
+    logger.setLevel(level)
+    logger.propagate = False
+
+    with _lock:
+        if _handler is None:
+            if Config.LOG_FORMAT == 'json':
+                formatter = JsonFormatter()
+            else:
+                formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] %(message)s")
+
+            _handler = RequestQueueHandler(None)
+            _start_listener(_output_handlers(log_file, formatter))
+            os.register_at_fork(after_in_child=_restart_after_fork)
+            atexit.register(_stop_listener)
+        if _handler not in logger.handlers:
+            logger.addHandler(_handler)
+
+    return logger
+
+logger = setup_logger()
@@ -0,0 +1,31 @@
+import os
+
+_FIELDS = ('Rss', 'Pss', 'Shared_Clean', 'Shared_Dirty', 'Private_Clean', 'Private_Dirty')
+
+
+def process_memory(pid='self'):
+    """
+    Return the RSS, PSS and shared/private bytes of a process from /proc (Linux only).
+
+    PSS splits every shared page between the processes mapping it, so summing the PSS of the
+    workers gives the real footprint of a pre-forked server, while RSS counts shared pages once
+    per worker.
+    """
+    usage = {}
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as f:
+            for line in f:
+                name, _, value = line.partition(':')
+                if name in _FIELDS:
+                    usage[name.lower()] = int(value.split()[0]) * 1024
+    except (OSError, ValueError):
+        try:
+            with open(f'/proc/{pid}/statm') as f:
+                usage['rss'] = int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        except (OSError, ValueError):
+            pass
+    return usage
+
+
+def format_memory(usage):
+    return ', '.join(f'{name}={value / 2 ** 20:.1f}MB' for name, value in usage.items()) or 'n/a'
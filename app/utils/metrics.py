@@ -0,0 +1,164 @@
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from settings import Config
+from utils import profiling
+from utils.logger import logger
+
+try:
+    import prometheus_client
+    from prometheus_client import multiprocess
+except ImportError:  # Sin prometheus_client las métricas se desactivan
+    prometheus_client = None
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+INLIER_BUCKETS = (0, 10, 20, 30, 40, 60, 80, 120, 160, 240, 400, 800)
+
+enabled = Config.METRICS_ENABLED and prometheus_client is not None
+
+if enabled and os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+    # prometheus_client escribe un fichero por proceso en ese directorio y falla si no existe
+    os.makedirs(os.environ['PROMETHEUS_MULTIPROC_DIR'], exist_ok=True)
+
+_queues = {}
+_queues_lock = threading.Lock()
+_refresher_pid = None
+
+if enabled:
+    STAGE_SECONDS = prometheus_client.Histogram(
+        'card_stage_seconds', 'Latency of each pipeline stage', ['stage'], buckets=LATENCY_BUCKETS)
+    OCR_FIELD_SECONDS = prometheus_client.Histogram(
+        'card_ocr_field_seconds', 'Tesseract latency of each front field', ['field'], buckets=LATENCY_BUCKETS)
+    OCR_FIELD_FAILURES = prometheus_client.Counter(
+        'card_ocr_field_failures_total', 'Front fields whose OCR raised or came back empty', ['field'])
+    ALIGNMENT_INLIERS = prometheus_client.Histogram(
+        'card_alignment_inliers', 'RANSAC inliers of the homography used to align an upload',
+        ['side', 'backend'], buckets=INLIER_BUCKETS)
+    ALIGNMENT_FAILURES = prometheus_client.Counter(
+        'card_alignment_failures_total', 'Uploads that could not be aligned', ['side'])
+    VALIDATIONS = prometheus_client.Counter(
+        'card_validations_total', 'Validation outcomes (success, failure, error)', ['result'])
+    VALIDATION_CHECK_FAILURES = prometheus_client.Counter(
+        'card_validation_check_failures_total', 'Failed checks within validations', ['check'])
+    QUALITY_ISSUES = prometheus_client.Counter(
+        'card_quality_issues_total', 'Uploads flagged by the pre-alignment quality gate',
+        ['side', 'check', 'severity'])
+    QUEUE_DEPTH = prometheus_client.Gauge(
+        'card_queue_depth', 'Queued and running tasks of each executor', ['queue', 'state'],
+        multiprocess_mode='livesum')
+
+
+def observe(stage, seconds):
+    if enabled:
+        STAGE_SECONDS.labels(stage).observe(seconds)
+    profiling.record_stage(stage, seconds)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Stage timing", extra={"stage": stage, "seconds": round(seconds, 6)})
+
+
+@contextmanager
+def timer(stage):
+    """
+    Record the duration of the enclosed block as the latency of a pipeline stage (also in the
+    profile of the request, when it is being profiled).
+    """
+    if not enabled and not profiling.active():
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(stage, time.perf_counter() - start)
+
+
+def observe_field(field, seconds=None, failed=False):
+    if seconds is not None:
+        profiling.record_stage(f'ocr_field.{field}', seconds)
+    if not enabled:
+        return
+    if seconds is not None:
+        OCR_FIELD_SECONDS.labels(field).observe(seconds)
+    if failed:
+        OCR_FIELD_FAILURES.labels(field).inc()
+
+
+def observe_alignment(side, backend, inliers, aligned):
+    if not enabled:
+        return
+    ALIGNMENT_INLIERS.labels(side, backend).observe(inliers)
+    if not aligned:
+        ALIGNMENT_FAILURES.labels(side).inc()
+
+
+def count_validation(result, failed_checks=()):
+    if not enabled:
+        return
+    VALIDATIONS.labels(result).inc()
+    for check in failed_checks:
+        VALIDATION_CHECK_FAILURES.labels(check).inc()
+
+
+def count_quality(side, issues):
+    if not enabled:
+        return
+    for issue in issues:
+        QUALITY_ISSUES.labels(side, issue["check"], issue["severity"]).inc()
+
+
+def track_queue(name, stats):
+    """
+    Publish the depth of a queue: stats() must return a dict with 'pending'/'queued' and 'running'.
+    The gauges are refreshed periodically by a thread of the current process and on every scrape.
+    """
+    global _refresher_pid
+    if not enabled:
+        return
+    with _queues_lock:
+        _queues[name] = stats
+        if _refresher_pid != os.getpid():
+            # Un hilo por proceso (los hilos no sobreviven al fork de los workers)
+            _refresher_pid = os.getpid()
+            threading.Thread(target=_refresh_loop, name='metrics-queues', daemon=True).start()
+
+
+def _refresh_queues():
+    with _queues_lock:
+        queues = list(_queues.items())
+    for name, stats in queues:
+        try:
+            values = stats()
+        except Exception:
+            continue
+        QUEUE_DEPTH.labels(name, 'queued').set(values.get('pending', values.get('queued', 0)))
+        QUEUE_DEPTH.labels(name, 'running').set(values.get('running', 0))
+
+
+def _refresh_loop():
+    while True:
+        _refresh_queues()
+        time.sleep(Config.METRICS_QUEUE_REFRESH_SECONDS)
+
+
+def render():
+    """
+    Return (body, content type) of the Prometheus text exposition. With PROMETHEUS_MULTIPROC_DIR
+    set (gunicorn), the samples of every worker are aggregated.
+    """
+    if not enabled:
+        return b'# metrics disabled\n', 'text/plain; charset=utf-8'
+
+    _refresh_queues()
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        registry = prometheus_client.CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = prometheus_client.REGISTRY
+    return prometheus_client.generate_latest(registry), prometheus_client.CONTENT_TYPE_LATEST
+
+
+def mark_process_dead(pid):
+    if enabled and os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        multiprocess.mark_process_dead(pid)
@@ -1,13 +1,15 @@
 from functools import lru_cache
 import os
 import cv2
+from settings import Config
+from utils import feature_pack
 
 @lru_cache(maxsize=1)
 def get_front_reference_images():
     """
     Load and cache back reference images as numpy arrays for alignment.
     """
-    reference_folder = './public/front_references'
+    reference_folder = Config.FRONT_REFERENCES_DIR
     reference_images = []
 
     for filename in os.listdir(reference_folder):
@@ -24,7 +26,7 @@ def get_back_reference_images():
     """
     Load and cache back reference images as numpy arrays for alignment.
     """
-    reference_folder = './public/back_references'
+    reference_folder = Config.BACK_REFERENCES_DIR
     reference_images = []
 
     for filename in os.listdir(reference_folder):
@@ -35,3 +37,19 @@ def get_back_reference_images():
                 reference_images.append(image)
 
     return reference_images
+
+def get_front_reference_features(backend='sift'):
+    """
+    Return the memory-mapped feature pack of the front references, reloaded when the folder changes.
+    """
+    return feature_pack.get_feature_pack(
+        Config.FRONT_REFERENCES_DIR, Config.FEATURE_PACK_DIR, f'front-{backend}', Config.FEATURE_PACK_NFEATURES, backend
+    )
+
+def get_back_reference_features(backend='sift'):
+    """
+    Return the memory-mapped feature pack of the back references, reloaded when the folder changes.
+    """
+    return feature_pack.get_feature_pack(
+        Config.BACK_REFERENCES_DIR, Config.FEATURE_PACK_DIR, f'back-{backend}', Config.FEATURE_PACK_NFEATURES, backend
+    )
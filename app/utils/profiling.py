@@ -0,0 +1,159 @@
+import contextvars
+import cProfile
+import hmac
+import io
+import json
+import os
+import pstats
+import random
+import threading
+import time
+from settings import Config
+from utils import request_context
+
+# Etapas medidas durante la petición que se está perfilando (None si no se perfila)
+_stages = contextvars.ContextVar('profile_stages', default=None)
+_rotate_lock = threading.Lock()
+# Un solo perfil activo por proceso: desde Python 3.12 cProfile usa sys.monitoring, que admite
+# un único profiler por intérprete (y mide todos los hilos, no solo el de la petición)
+_profile_lock = threading.Lock()
+
+
+def authorized(header_value):
+    """
+    Whether a header carries PROFILE_SECRET. Without a configured secret nothing is authorized.
+    """
+    if not Config.PROFILE_SECRET or not header_value:
+        return False
+    return hmac.compare_digest(header_value.encode(), Config.PROFILE_SECRET.encode())
+
+
+def requested(header_value):
+    """
+    Whether to profile a request: it carries the secret in PROFILE_HEADER or falls in the
+    PROFILE_SAMPLE_RATE sample.
+    """
+    if authorized(header_value):
+        return True
+    return Config.PROFILE_SAMPLE_RATE > 0 and random.random() < Config.PROFILE_SAMPLE_RATE
+
+
+def active():
+    return _stages.get() is not None
+
+
+def record_stage(stage, seconds):
+    stages = _stages.get()
+    if stages is not None:
+        stages.append((stage, seconds))
+
+
+def profiled(route, header_value, fn, *args, **kwargs):
+    """
+    Call fn. When the request is selected, the call runs under cProfile and the profile is saved
+    with the request ID and the stage timings recorded meanwhile; otherwise fn is called as is.
+    Only one request per process is profiled at a time: while another profile is running, the
+    call runs unprofiled.
+    """
+    if not requested(header_value) or not _profile_lock.acquire(blocking=False):
+        return fn(*args, **kwargs)
+    try:
+        return _run_profiled(route, fn, *args, **kwargs)
+    finally:
+        _profile_lock.release()
+
+
+def _run_profiled(route, fn, *args, **kwargs):
+    stages = []
+    token = _stages.set(stages)
+    profiler = cProfile.Profile()
+    start = time.perf_counter()
+    try:
+        return profiler.runcall(fn, *args, **kwargs)
+    finally:
+        elapsed = time.perf_counter() - start
+        _stages.reset(token)
+        save(route, profiler, stages, elapsed)
+
+
+def _summarize(stages):
+    summary = {}
+    for stage, seconds in stages:
+        entry = summary.setdefault(stage, {"count": 0, "total_ms": 0.0})
+        entry["count"] += 1
+        entry["total_ms"] = round(entry["total_ms"] + seconds * 1000, 3)
+    return summary
+
+
+def _top_functions(profiler, limit):
+    output = io.StringIO()
+    pstats.Stats(profiler, stream=output).sort_stats('cumulative').print_stats(limit)
+    return output.getvalue()
+
+
+def save(route, profiler, stages, elapsed):
+    """
+    Write <PROFILE_DIR>/<timestamp>_<route>_<request id>.prof (pstats) and a .json summary next
+    to it, keeping only the newest PROFILE_MAX_FILES profiles.
+    """
+    request_id = request_context.get_request_id() or 'no-request-id'
+    now = time.time()
+    # El nombre empieza por la hora (con milisegundos), así el orden alfabético es el cronológico
+    name = f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(now))}.{int(now * 1000) % 1000:03d}_{route}_{request_id}"
+    os.makedirs(Config.PROFILE_DIR, exist_ok=True)
+    base = os.path.join(Config.PROFILE_DIR, name)
+
+    profiler.dump_stats(base + '.prof')
+    summary = {
+        "name": name,
+        "route": route,
+        "request_id": request_id,
+        "created_at": time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(now)),
+        "seconds": round(elapsed, 4),
+        "stages": _summarize(stages),
+        "top_functions": _top_functions(profiler, Config.PROFILE_TOP_FUNCTIONS)
+    }
+    with open(base + '.json', 'w', encoding='utf-8') as f:
+        json.dump(summary, f, indent=2, ensure_ascii=False)
+    _rotate()
+
+
+def _rotate():
+    with _rotate_lock:
+        names = sorted(entry[:-5] for entry in os.listdir(Config.PROFILE_DIR) if entry.endswith('.json'))
+        for name in names[:max(0, len(names) - Config.PROFILE_MAX_FILES)]:
+            for extension in ('.json', '.prof'):
+                try:
+                    os.remove(os.path.join(Config.PROFILE_DIR, name + extension))
+                except FileNotFoundError:
+                    pass
+
+
+def list_profiles():
+    """
+    Return the summaries of the saved profiles, newest first.
+    """
+    if not os.path.isdir(Config.PROFILE_DIR):
+        return []
+    profiles = []
+    for entry in sorted(os.listdir(Config.PROFILE_DIR), reverse=True):
+        if not entry.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(Config.PROFILE_DIR, entry), encoding='utf-8') as f:
+                summary = json.load(f)
+        except (OSError, ValueError):
+            continue
+        summary.pop("top_functions", None)
+        profiles.append(summary)
+    return profiles
+
+
+def profile_path(name):
+    """
+    Path of a saved profile (.prof or .json) by file name, or None if it does not exist.
+    """
+    if os.path.basename(name) != name or not name.endswith(('.prof', '.json')):
+        return None
+    path = os.path.abspath(os.path.join(Config.PROFILE_DIR, name))
+    return path if os.path.isfile(path) else None
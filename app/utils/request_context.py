@@ -0,0 +1,25 @@
+import contextvars
+import re
+import uuid
+
+REQUEST_ID_HEADER = 'X-Request-ID'
+
+# Identificadores recibidos del cliente: solo caracteres seguros para logs y nombres de archivo
+_VALID_ID = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+
+_request_id = contextvars.ContextVar('request_id', default=None)
+
+
+def start_request(request_id=None):
+    """
+    Bind a request ID to the current context (thread or task) and return it. The client's ID is
+    kept when it is safe to reuse, otherwise a new one is generated.
+    """
+    if not request_id or not _VALID_ID.match(request_id):
+        request_id = uuid.uuid4().hex
+    _request_id.set(request_id)
+    return request_id
+
+
+def get_request_id():
+    return _request_id.get()
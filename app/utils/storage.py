@@ -0,0 +1,178 @@
+import hashlib
+import os
+import threading
+import time
+import cv2
+from settings import Config
+from utils.logger import logger
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+class ContentStore:
+    """
+    Content-addressed, sharded image folder with a size and age cap.
+
+    Files are named by the SHA-256 of their encoded bytes, so a resubmitted image maps to the
+    existing file instead of a new one. A background thread deletes files older than max_age
+    and then the least recently written ones until the folder fits in max_bytes.
+    """
+
+    def __init__(self, root, max_bytes, max_age, eviction_interval=60, shard_depth=2):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.eviction_interval = eviction_interval
+        self.shard_depth = shard_depth
+        self._lock = threading.Lock()
+        self._evictor = None
+        self._stats = {
+            "files": 0,
+            "bytes": 0,
+            "writes": 0,
+            "deduplicated": 0,
+            "evicted_files": 0,
+            "evicted_bytes": 0,
+            "last_eviction": None
+        }
+
+    def path_for(self, digest, prefix, extension):
+        shards = [digest[2 * i:2 * i + 2] for i in range(self.shard_depth)]
+        return os.path.join(self.root, *shards, f'{prefix}_{digest}{extension}')
+
+    def save_image(self, image, prefix, extension='.jpg'):
+        """
+        Encode an image and store it under its content hash. Returns the file path.
+        """
+        ok, encoded = cv2.imencode(extension, image)
+        if not ok:
+            raise ValueError(f"Could not encode image as {extension}")
+        data = encoded.tobytes()
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.path_for(digest, prefix, extension)
+
+        self._ensure_evictor()
+        try:
+            # Mismo contenido: reutilizar el archivo y renovar su antigüedad
+            os.utime(path)
+        except FileNotFoundError:
+            pass  # No existe o el desalojo lo acaba de borrar: escribirlo de nuevo
+        else:
+            with self._lock:
+                self._stats["deduplicated"] += 1
+            return path
+
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        for attempt in range(2):
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(tmp_path, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+                break
+            except FileNotFoundError:
+                # El desalojo borró la subcarpeta vacía entre medias; crearla de nuevo
+                if attempt:
+                    raise
+
+        with self._lock:
+            self._stats["writes"] += 1
+            self._stats["files"] += 1
+            self._stats["bytes"] += len(data)
+        return path
+
+    def _ensure_evictor(self):
+        if self._evictor is None:
+            with self._lock:
+                if self._evictor is None:
+                    self._evictor = threading.Thread(target=self._eviction_loop, name=f'storage-evictor-{self.root}', daemon=True)
+                    self._evictor.start()
+
+    def _eviction_loop(self):
+        while True:
+            try:
+                self.evict()
+            except Exception as e:
+                logger.warning(f"Error al liberar espacio en {self.root}: {e}")
+            time.sleep(self.eviction_interval)
+
+    def evict(self):
+        """
+        Delete expired files, then the oldest ones until the folder is under its size cap.
+        """
+        now = time.time()
+        files = []
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+
+        files.sort()
+        total_bytes = sum(size for _, size, _ in files)
+        evicted_files, evicted_bytes = 0, 0
+
+        for mtime, size, path in files:
+            if now - mtime <= self.max_age and total_bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total_bytes -= size
+            evicted_files += 1
+            evicted_bytes += size
+
+        self._remove_empty_shards()
+
+        with self._lock:
+            self._stats["files"] = len(files) - evicted_files
+            self._stats["bytes"] = total_bytes
+            self._stats["evicted_files"] += evicted_files
+            self._stats["evicted_bytes"] += evicted_bytes
+            self._stats["last_eviction"] = now
+
+    def _remove_empty_shards(self):
+        for dirpath, _, _ in os.walk(self.root, topdown=False):
+            if dirpath != self.root:
+                try:
+                    os.rmdir(dirpath)  # Solo tiene éxito si la carpeta quedó vacía
+                except OSError:
+                    pass
+
+    def stats(self):
+        # Solo el nombre de la carpeta: /_stats es público y no debe exponer rutas del servidor
+        with self._lock:
+            return dict(self._stats, store=os.path.basename(os.path.normpath(self.root)),
+                        max_bytes=self.max_bytes, max_age=self.max_age)
+
+
+def get_store(root):
+    """
+    Return the content store for a folder, configured with the storage limits from settings.
+    """
+    key = os.path.normpath(root)
+    store = _stores.get(key)
+    if store is None:
+        with _stores_lock:
+            store = _stores.get(key)
+            if store is None:
+                store = ContentStore(
+                    root,
+                    Config.STORAGE_MAX_BYTES,
+                    Config.STORAGE_MAX_AGE_SECONDS,
+                    Config.STORAGE_EVICTION_INTERVAL
+                )
+                _stores[key] = store
+    return store
+
+
+def usage_stats():
+    """
+    Return the usage stats of every content store in use.
+    """
+    return [store.stats() for store in list(_stores.values())]
@@ -0,0 +1,75 @@
+# Configuración de gunicorn para producción: gunicorn (sin argumentos) desde la raíz del proyecto
+import gc
+import os
+import shutil
+import sys
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app'))
+
+# Métricas agregadas entre workers: solo para gunicorn, antes de que se importe prometheus_client
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'prometheus'))
+os.makedirs(os.environ['PROMETHEUS_MULTIPROC_DIR'], exist_ok=True)
+
+# Los IDs de /api/ocr/front deben resolverse en cualquier worker: artefactos en un directorio
+# compartido (tmpfs si existe /dev/shm) salvo que ARTIFACT_SHARED_DIR se haya fijado explícitamente
+_shm = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+os.environ.setdefault('ARTIFACT_SHARED_DIR', os.path.join(_shm, 'biometria-artifacts'))
+
+from settings import Config
+from utils.memory import process_memory, format_memory
+
+wsgi_app = f'app:create_app(preload={Config.WEB_PRELOAD})'
+preload_app = Config.WEB_PRELOAD
+bind = Config.WEB_BIND
+workers = Config.WEB_WORKERS
+threads = Config.WEB_THREADS
+worker_class = 'gthread'
+timeout = Config.WEB_TIMEOUT
+
+if workers > 1 and not Config.ARTIFACT_SHARED_DIR:
+    raise RuntimeError("WEB_WORKERS > 1 requires ARTIFACT_SHARED_DIR: /api/validate could not resolve "
+                       "the artifact IDs issued by another worker")
+
+
+def on_starting(server):
+    # Métricas de varios workers: vaciar el directorio de la ejecución anterior
+    multiproc_dir = os.getenv('PROMETHEUS_MULTIPROC_DIR')
+    if multiproc_dir:
+        shutil.rmtree(multiproc_dir, ignore_errors=True)
+        os.makedirs(multiproc_dir)
+
+
+def when_ready(server):
+    server.log.info(f"Maestro listo (pid {os.getpid()}): {format_memory(process_memory())}")
+
+
+def pre_fork(server, worker):
+    # Congelar los objetos cargados en el maestro: el GC de los workers no los recorre
+    # ni escribe en sus cabeceras, así sus páginas siguen compartidas (copy-on-write)
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    import torch
+    from services import lifecycle
+
+    # Tras el fork torch queda con un solo hilo; repartir los núcleos entre los workers
+    torch.set_num_threads(Config.TORCH_THREADS or max(1, (os.cpu_count() or 1) // Config.WEB_WORKERS))
+
+    server.log.info(f"Worker {worker.pid} iniciado: {format_memory(process_memory())}")
+    lifecycle.start()
+
+    def report():
+        ready = lifecycle.wait()
+        server.log.info(f"Worker {worker.pid} {'listo' if ready else 'con errores de arranque'}: {format_memory(process_memory())}")
+
+    threading.Thread(target=report, name='lifecycle-report', daemon=True).start()
+
+
+def child_exit(server, worker):
+    from utils import metrics
+
+    # Descartar los gauges del worker que terminó; sus contadores e histogramas se conservan
+    metrics.mark_process_dead(worker.pid)